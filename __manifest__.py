@@ -35,6 +35,7 @@
         'views/whatsapp_group_views.xml',
         'views/whatsapp_message_views.xml',
         'views/whatsapp_sync_service_views.xml',
+        'views/invite_templates.xml',
         'views/whatsapp_menu.xml',
     ],
     'external_dependencies': {
@@ -2,6 +2,7 @@
 WhatsApp Integration Constants
 Centralized constants for better maintainability
 """
+from types import MappingProxyType
 
 # API Timeouts
 API_TIMEOUT_SHORT = 30  # seconds
@@ -12,6 +13,10 @@ MAX_RETRIES = 3
 RETRY_BACKOFF_FACTOR = 1
 RETRY_STATUS_CODES = [429, 500, 502, 503, 504]
 
+# HTTP connection pool
+HTTP_POOL_CONNECTIONS = 100
+HTTP_POOL_MAXSIZE = 100
+
 # Message Types
 MESSAGE_TYPES = [
     ('text', 'Text'),
@@ -61,7 +66,7 @@ PROVIDER_WASSENGER = 'wassenger'
 PROVIDER_TWILIO = 'twilio'
 
 # MIME Types
-MIME_TYPES = {
+_MIME_TYPES = {
     'image': {
         '.png': 'image/png',
         '.jpg': 'image/jpeg',
@@ -92,6 +97,36 @@ MIME_TYPES = {
     }
 }
 
+# Read-only views of the MIME table, plus flat lookups built once at import:
+# (media_type, '.ext') -> MIME type, and media_type -> default MIME type
+MIME_TYPES = MappingProxyType({kind: MappingProxyType(types) for kind, types in _MIME_TYPES.items()})
+FLAT_MIME_TYPES = MappingProxyType({
+    (kind, ext): mime
+    for kind, types in _MIME_TYPES.items()
+    for ext, mime in types.items()
+    if ext != 'default'
+})
+DEFAULT_MIME_TYPES = MappingProxyType({kind: types['default'] for kind, types in _MIME_TYPES.items()})
+
+# In-process cache settings
+INVITE_PAGE_CACHE_SIZE = 4096
+INVITE_PAGE_CACHE_TTL = 300  # seconds
+INVITE_PAGE_MAX_AGE = 60  # seconds, browser-side revalidation window
+INVITE_PAGE_HTML_CACHE_SIZE = 1024
+INVITE_PAGE_HTML_CACHE_TTL = 60  # seconds
+
+# Invite code fetch throttling
+INVITE_FETCH_MIN_INTERVAL = 30  # seconds between fetches of the same group
+INVITE_FETCH_BREAKER_FAIL_MAX = 5
+INVITE_FETCH_BREAKER_RESET = 60  # seconds
+INVITE_FETCH_CRON_BUDGET = 60  # seconds of WHAPI calls per cron run before yielding the cron worker
+
+# Webhook lookups: channel_id -> configuration id, WHAPI group/contact id -> record id
+CHANNEL_CONFIG_CACHE_SIZE = 1024
+CHANNEL_CONFIG_CACHE_TTL = 60  # seconds
+WEBHOOK_ID_CACHE_SIZE = 8192
+WEBHOOK_ID_CACHE_TTL = 300  # seconds
+
 # Pagination Defaults
 DEFAULT_PAGE_SIZE = 100
 MAX_PAGE_SIZE = 500
@@ -99,9 +134,13 @@ MAX_PAGE_SIZE = 500
 # WhatsApp ID Patterns
 WHATSAPP_GROUP_SUFFIX = '@g.us'
 WHATSAPP_USER_SUFFIX = '@s.whatsapp.net'
+WHATSAPP_GROUP_SUFFIX_LEN = len(WHATSAPP_GROUP_SUFFIX)
+WHATSAPP_USER_SUFFIX_LEN = len(WHATSAPP_USER_SUFFIX)
 
 # Image Headers for Double Encoding Detection
-IMAGE_HEADERS = [
+# Matched with str.startswith(tuple), a single C call that is faster than a compiled
+# regex alternation over the same prefixes
+IMAGE_HEADERS = (
     'iVBORw0KGgo',  # PNG
     '/9j/',         # JPEG (standard)
     'R0lGOD',       # GIF87a and GIF89a
@@ -112,7 +151,19 @@ IMAGE_HEADERS = [
     '/0//',         # JPEG2000
     'AAABAA',       # ICO
     'data:image/',  # Data URL format
-]
+)
+# Same headers as raw bytes, compared against decoded data without converting it to text
+IMAGE_HEADER_BYTES = tuple(header.encode('ascii') for header in IMAGE_HEADERS)
+
+# Magic numbers of decoded image data, most common format first; WebP also carries
+# 'WEBP' at offset 8
+IMAGE_SIGNATURES = (
+    (b'\xff\xd8\xff', 'image/jpeg'),
+    (b'\x89PNG\r\n\x1a\n', 'image/png'),
+    (b'GIF87a', 'image/gif'),
+    (b'GIF89a', 'image/gif'),
+    (b'RIFF', 'image/webp'),
+)
 
 # Error Messages
 ERROR_MESSAGES = {
@@ -124,3 +175,24 @@ ERROR_MESSAGES = {
     'PERMISSION_DENIED': 'Permission denied',
     'RATE_LIMIT': 'Rate limit exceeded',
 }
+
+# Webhook queue
+WEBHOOK_QUEUE_BATCH_SIZE = 200
+WEBHOOK_QUEUE_MAX_ATTEMPTS = 3
+WEBHOOK_QUEUE_RETENTION_DAYS = 7
+# One cron per lane; payloads of a channel always share a lane so they stay in order
+WEBHOOK_QUEUE_LANE_CRONS = (
+    'whatsapp_integration.ir_cron_process_webhook_queue',
+    'whatsapp_integration.ir_cron_process_webhook_queue_lane_1',
+)
+
+# Sync jobs queued by the sync endpoints; each job can run for minutes, so a cron run takes a few
+SYNC_JOB_BATCH_SIZE = 5
+SYNC_JOB_RETENTION_DAYS = 7
+SYNC_JOB_CRON = 'whatsapp_integration.ir_cron_process_sync_jobs'
+
+# Audit log cleanup deletes in batches of this many rows
+AUDIT_LOG_CLEANUP_BATCH_SIZE = 5000
+
+# Contact sync
+CONTACT_SYNC_BATCH_SIZE = 200  # API contacts upserted together
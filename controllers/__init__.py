@@ -1,2 +1,3 @@
 from . import whatsapp_controller
-from . import webhook_controller
\ No newline at end of file
+from . import webhook_controller
+from . import invite_controller
@@ -1,41 +1,109 @@
 from odoo import http
 from odoo.http import request
+from werkzeug.wrappers import Response
 import logging
+from ..constants import INVITE_PAGE_MAX_AGE
+from ..utils import json_dumps
 
 _logger = logging.getLogger(__name__)
 
+# Served as-is for unknown groups, so probes for random ids never reach QWeb
+_NOT_FOUND_HTML = (
+    b'<!DOCTYPE html><html><head><meta charset="utf-8"/><title>Group not found</title></head>'
+    b'<body style="font-family: sans-serif; text-align: center; margin-top: 100px;">'
+    b'<h2>Error</h2><p>Group not found</p><a href="/web">Back to Dashboard</a>'
+    b'</body></html>'
+)
+
 class InviteController(http.Controller):
-    
-    @http.route('/whatsapp/group/invite/<int:group_id>', type='http', auth='user', website=True)
+
+    @http.route('/whatsapp/group/invite/<int:group_id>', type='http', auth='user', methods=['GET'], sitemap=False)
     def group_invite_page(self, group_id, **kwargs):
         """Display a nice page with the group invite link"""
         try:
-            group = request.env['whatsapp.group'].browse(group_id)
-            
-            if not group.exists():
-                return request.render('whatsapp_integration.invite_error', {
-                    'error_message': 'Group not found'
-                })
-            
-            # Check if user has access to this group
-            if not group.check_access_rights('read', raise_exception=False):
+            Group = request.env['whatsapp.group']
+            # Check if user has access to groups at all
+            if not Group.check_access_rights('read', raise_exception=False):
                 return request.render('whatsapp_integration.invite_error', {
                     'error_message': 'Access denied'
                 })
-            
-            # If no invite link exists, try to fetch it
-            if not group.invite_link and group.provider == 'whapi':
-                try:
-                    group.fetch_invite_link()
-                except Exception as e:
-                    _logger.error(f"Failed to fetch invite link: {e}")
-            
-            return request.render('whatsapp_integration.group_invite_page', {
-                'group': group,
-            })
-            
+
+            # Access is checked on every request, before anything cached is used
+            stamp = Group._get_invite_page_stamp(group_id)
+            if stamp is None:
+                return Response(_NOT_FOUND_HTML, status=404, mimetype='text/html')
+
+            cache_key = (request.env.cr.dbname, group_id, request.env.uid, stamp)
+            values = Group._invite_page_cache.get(cache_key)
+            cacheable = True
+
+            if values is None:
+                values = Group._read_invite_page_values(group_id)
+                if values is None:
+                    return Response(_NOT_FOUND_HTML, status=404, mimetype='text/html')
+
+                # If no invite link exists, queue the fetch instead of blocking on WHAPI
+                if not values['invite_link'] and values['provider'] == 'whapi':
+                    try:
+                        if Group.browse(group_id)._queue_invite_fetch():
+                            values['invite_fetch_pending'] = True
+                    except Exception:
+                        _logger.exception("Failed to queue invite link fetch for group %s", group_id)
+
+                # Pages waiting for their link are never cached: the cron stores the link
+                # from another worker and the polling page reloads to show it
+                cacheable = bool(values['invite_link'])
+                if cacheable:
+                    Group._invite_page_cache.set(cache_key, values)
+
+            # Repeat opens and link checkers revalidate without a re-render
+            if request.httprequest.if_none_match.contains(values['etag']):
+                response = Response(status=304)
+            else:
+                html_key = cache_key + (values['etag'],)
+                html = Group._invite_page_html_cache.get(html_key)
+                cache_status = 'HIT'
+                if html is None:
+                    html = request.render('whatsapp_integration.group_invite_page', {
+                        'group': values,
+                    }, lazy=False)
+                    if cacheable:
+                        Group._invite_page_html_cache.set(html_key, html)
+                    cache_status = 'MISS'
+                response = request.make_response(html, headers=[
+                    ('Content-Type', 'text/html; charset=utf-8'),
+                    ('X-Cache', cache_status),
+                ])
+            response.set_etag(values['etag'])
+            response.headers['Cache-Control'] = (
+                f'private, max-age={INVITE_PAGE_MAX_AGE}' if cacheable else 'no-cache')
+            return response
+
         except Exception as e:
-            _logger.error(f"Error displaying invite page: {e}")
+            _logger.exception("Error displaying invite page for group %s", group_id)
             return request.render('whatsapp_integration.invite_error', {
                 'error_message': str(e)
             })
+
+    @http.route('/whatsapp/group/invite/<int:group_id>/status', type='http', auth='user', methods=['GET'])
+    def group_invite_status(self, group_id, **kwargs):
+        """Polled by the invite page while the invite link is being fetched"""
+        Group = request.env['whatsapp.group']
+        rows = []
+        if Group._has_invite_page_access(group_id):
+            rows = Group.sudo().with_context(skip_config_filter=True).search_read(
+                [('id', '=', group_id)], ['invite_link', 'invite_fetch_pending'], limit=1)
+        if not rows:
+            return request.make_response(
+                json_dumps({'error': 'Group not found'}),
+                headers=[('Content-Type', 'application/json')],
+                status=404,
+            )
+
+        return request.make_response(
+            json_dumps({
+                'invite_link': rows[0]['invite_link'] or False,
+                'pending': rows[0]['invite_fetch_pending'],
+            }),
+            headers=[('Content-Type', 'application/json')],
+        )
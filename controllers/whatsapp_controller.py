@@ -1,37 +1,48 @@
-import json
 import logging
-from odoo import http, fields
+from odoo import http
 from odoo.http import request
 from ..constants import PROVIDER_WHAPI, PROVIDER_WASSENGER, STATUS_SENT, STATUS_DELIVERED
+from ..utils import json_dumps, now_isoformat
 
 _logger = logging.getLogger(__name__)
 
+# The health payload never changes, so it is serialized once at import
+_HEALTH_JSON = json_dumps({"status": "healthy", "service": "Wassenger WhatsApp Management API"})
+_HEALTH_HEADERS = [('Content-Type', 'application/json'), ('Cache-Control', 'no-store')]
+
 class WhatsAppController(http.Controller):
     
     @http.route('/api/whatsapp/groups', type='json', auth='user', methods=['GET'])
     def get_all_groups(self):
         """Get all WhatsApp groups with members"""
         try:
-            groups = request.env['whatsapp.group'].search([('is_active', '=', True)])
-            return [{
-                'id': group.id,
-                'group_id': group.group_id,
-                'wid': group.wid,
-                'name': group.name,
-                'description': group.description,
-                'member_count': len(group.member_ids),
-                'members': [{'id': m.id, 'phone': m.phone, 'name': m.name} for m in group.member_ids]
-            } for group in groups]
+            Group = request.env['whatsapp.group']
+            groups = Group.search_read([('is_active', '=', True)], ['group_id', 'wid', 'name', 'description'])
+            
+            # Members of every group with one relation query and one contact read.
+            # The search skips participants hidden from the user by the contact rule.
+            member_ids = Group._get_participant_ids_by_group([group['id'] for group in groups])
+            contact_ids = {contact_id for ids in member_ids.values() for contact_id in ids}
+            contacts = {
+                contact['id']: contact
+                for contact in request.env['whatsapp.contact'].search_read(
+                    [('id', 'in', list(contact_ids))], ['phone', 'name'])
+            }
+            
+            for group in groups:
+                members = [contacts[contact_id] for contact_id in member_ids[group['id']] if contact_id in contacts]
+                group['member_count'] = len(members)
+                group['members'] = members
+            return groups
         except Exception as e:
             _logger.error(f"Error getting groups: {e}")
             return {'error': str(e)}
     
     @http.route('/api/whatsapp/groups/sync', type='json', auth='user', methods=['POST'])
     def sync_groups(self):
-        """Sync groups from Wassenger API to database"""
+        """Queue a sync of groups from the provider API to the database"""
         try:
-            result = request.env['whatsapp.service'].sync_all_groups()
-            return result
+            return request.env['whatsapp.sync.job'].enqueue('groups').to_dict()
         except Exception as e:
             _logger.error(f"Error syncing groups: {e}")
             return {'error': str(e)}
@@ -113,7 +124,7 @@ class WhatsAppController(http.Controller):
                     'success': True,
                     'message_id': result.get('message_id', ''),
                     'status': STATUS_SENT,
-                    'sent_at': fields.Datetime.now().isoformat()
+                    'sent_at': now_isoformat()
                 }
             else:
                 return {
@@ -146,45 +157,75 @@ class WhatsAppController(http.Controller):
     
     @http.route('/api/whatsapp/contacts/sync', type='json', auth='user', methods=['POST'])
     def sync_contacts(self):
-        """Sync contacts from Wassenger API"""
+        """Queue a sync of contacts from the provider API"""
         try:
-            result = request.env['whatsapp.contact'].sync_all_contacts_from_api()
-            return result
+            return request.env['whatsapp.sync.job'].enqueue('contacts').to_dict()
         except Exception as e:
             _logger.error(f"Error syncing contacts: {e}")
             return {'error': str(e)}
     
     @http.route('/api/whatsapp/messages/sync', type='json', auth='user', methods=['POST'])
     def sync_messages(self, count=100, time_from=None, time_to=None, from_me=None, normal_types=False, sort='desc'):
-        """Sync messages from WHAPI using messages/list with pagination. 
+        """Queue a sync of messages from WHAPI using messages/list with pagination. 
         
         Now syncs both incoming and outgoing messages regardless of from_me parameter.
         If time_from/time_to omitted, last 30 days are used."""
         try:
-            result = request.env['whatsapp.message'].sync_all_messages_from_api(
+            return request.env['whatsapp.sync.job'].enqueue(
+                'messages',
                 count=count,
                 time_from=time_from,
                 time_to=time_to,
                 from_me=from_me,
                 normal_types=normal_types,
                 sort=sort,
-            )
-            return result
+            ).to_dict()
         except Exception as e:
             _logger.error(f"Error syncing messages: {e}")
             return {'error': str(e)}
     
+    @http.route('/api/whatsapp/sync/jobs/<int:job_id>', type='json', auth='user', methods=['GET', 'POST'])
+    def get_sync_job(self, job_id):
+        """State and result of a sync queued by one of the sync endpoints"""
+        job = request.env['whatsapp.sync.job'].sudo().browse(job_id).exists()
+        if not job or job.user_id.id != request.env.uid:
+            return {'error': 'Sync job not found'}
+        return job.to_dict()
+    
     @http.route('/api/whatsapp/admin/database-status', type='json', auth='user', methods=['GET'])
-    def get_database_status(self):
-        """Get current database status and record counts"""
+    def get_database_status(self, approximate=False):
+        """Get current database status and record counts
+
+        Counts are the records visible to the current user. WhatsApp administrators may
+        pass approximate=True to get PostgreSQL planner estimates of the whole tables
+        instead, read in one query.
+        """
         try:
-            return {
-                'status': 'connected',
-                'table_counts': {
+            approximate = approximate and request.env.user.has_group(
+                'whatsapp_integration.group_whatsapp_admin')
+            if approximate:
+                # reltuples is refreshed by (auto)vacuum/analyze and is -1 before the first one
+                request.env.cr.execute("""
+                    SELECT relname, GREATEST(reltuples, 0)::bigint FROM pg_class
+                    WHERE oid IN ('whatsapp_contact'::regclass, 'whatsapp_group'::regclass,
+                                  'whatsapp_message'::regclass)
+                """)
+                estimates = dict(request.env.cr.fetchall())
+                table_counts = {
+                    'whatsapp_contacts': estimates.get('whatsapp_contact', 0),
+                    'whatsapp_groups': estimates.get('whatsapp_group', 0),
+                    'whatsapp_messages': estimates.get('whatsapp_message', 0),
+                }
+            else:
+                table_counts = {
                     'whatsapp_contacts': request.env['whatsapp.contact'].search_count([]),
                     'whatsapp_groups': request.env['whatsapp.group'].search_count([]),
                     'whatsapp_messages': request.env['whatsapp.message'].search_count([]),
                 }
+            return {
+                'status': 'connected',
+                'approximate': bool(approximate),
+                'table_counts': table_counts,
             }
         except Exception as e:
             return {'error': str(e)}
@@ -192,4 +233,4 @@ class WhatsAppController(http.Controller):
     @http.route('/api/whatsapp/health', type='http', auth='public', methods=['GET'])
     def health_check(self):
         """Health check endpoint"""
-        return json.dumps({"status": "healthy", "service": "Wassenger WhatsApp Management API"})
+        return request.make_response(_HEALTH_JSON, headers=_HEALTH_HEADERS)
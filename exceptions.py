@@ -55,6 +55,14 @@ class WhatsAppWebhookError(WhatsAppError):
     pass
 
 
+class WhatsAppConcurrentInsertError(WhatsAppWebhookError):
+    """Raised when a record another transaction just committed is not visible yet
+
+    The payload has to be processed again in a new transaction.
+    """
+    pass
+
+
 class WhatsAppMediaError(WhatsAppError):
     """Raised when media processing fails"""
     def __init__(self, message, media_type=None, file_size=None, **kwargs):
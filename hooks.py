@@ -3,6 +3,15 @@ from odoo import api, SUPERUSER_ID
 
 _logger = logging.getLogger(__name__)
 
+MODULE = 'whatsapp_integration'
+
+# External ids given to the crons created by _create_cron_jobs, in creation order
+SYNC_CRON_XMLIDS = (
+    'ir_cron_whatsapp_data_sync',
+    'ir_cron_whatsapp_data_sync_frequent',
+    'ir_cron_whatsapp_full_data_sync_daily',
+)
+
 def post_init_hook(cr, registry):
     """
     Post-installation hook to initialize WhatsApp sync service and create cron jobs
@@ -33,63 +42,57 @@ def post_init_hook(cr, registry):
 def _create_cron_jobs(env):
     """Create WhatsApp cron jobs programmatically"""
     try:
-        # Check if cron jobs already exist
-        existing_crons = env['ir.cron'].search([
-            ('name', 'in', ['WhatsApp Data Sync', 'WhatsApp Data Sync (Frequent)', 'WhatsApp Full Data Sync (Daily)'])
-        ])
+        # Check if cron jobs already exist, through their external ids (indexed) rather than by name
+        existing_crons = env['ir.cron']
+        for xmlid in SYNC_CRON_XMLIDS:
+            existing_crons |= env.ref(f'{MODULE}.{xmlid}', raise_if_not_found=False) or env['ir.cron']
         
         if existing_crons:
             _logger.info(f"WhatsApp Integration: Found {len(existing_crons)} existing cron jobs, skipping creation")
             return existing_crons
         
-        # Get model reference
-        model_id = env['ir.model'].search([('model', '=', 'whatsapp.sync.service')], limit=1)
+        # Get model reference (cached by ir.model, no search needed)
+        model_id = env['ir.model']._get_id('whatsapp.sync.service')
         if not model_id:
             _logger.error("WhatsApp Integration: Could not find whatsapp.sync.service model")
             return False
         
-        # Get admin user (fallback to superuser if admin not found)
-        admin_user = env.ref('base.user_admin', raise_if_not_found=False)
-        if not admin_user:
-            admin_user = env.ref('base.user_root', raise_if_not_found=False)
+        # Admin user id from the cached xmlid lookup, falling back to the superuser (base.user_root)
+        admin_user_id = env['ir.model.data'].xmlid_to_res_id(
+            'base.user_admin', raise_if_not_found=False) or SUPERUSER_ID
         
-        if not admin_user:
-            _logger.error("WhatsApp Integration: Could not find admin or root user")
-            return False
-        
-        # Create hourly sync cron (active)
-        hourly_cron = env['ir.cron'].create({
+        # Hourly sync cron (active)
+        hourly_vals = {
             'name': 'WhatsApp Data Sync',
-            'model_id': model_id.id,
+            'model_id': model_id,
             'state': 'code',
             'code': 'model.cron_sync_all_data()',
             'interval_number': 1,
             'interval_type': 'hours',
             'numbercall': -1,
             'active': True,
-            'user_id': admin_user.id,
+            'user_id': admin_user_id,
             'doall': False,
-        })
-        _logger.info("WhatsApp Integration: Created hourly sync cron job")
+        }
         
-        # Create frequent sync cron (inactive)
-        frequent_cron = env['ir.cron'].create({
+        # Frequent sync cron (inactive)
+        frequent_vals = {
             'name': 'WhatsApp Data Sync (Frequent)',
-            'model_id': model_id.id,
+            'model_id': model_id,
             'state': 'code',
             'code': 'model.cron_sync_all_data()',
             'interval_number': 30,
             'interval_type': 'minutes',
             'numbercall': -1,
             'active': False,
-            'user_id': admin_user.id,
+            'user_id': admin_user_id,
             'doall': False,
-        })
-        _logger.info("WhatsApp Integration: Created frequent sync cron job")
+        }
         
-        # Create daily sync cron (inactive)
-        daily_sync_code = """configs = env['whatsapp.configuration'].search([('active', '=', True)])
-for config in configs:
+        # Daily sync cron (inactive)
+        # The sync methods use the cron user's configuration, so the full sync runs once
+        daily_sync_code = """config = env['whatsapp.configuration'].get_user_configuration()
+if config:
     try:
         env['whatsapp.message'].sync_all_messages_from_api(count=200)
         env['whatsapp.contact'].sync_all_contacts_from_api()
@@ -99,22 +102,30 @@ for config in configs:
         import logging
         logging.getLogger(__name__).error(f"Daily sync error for config {config.name}: {str(e)}")"""
         
-        daily_cron = env['ir.cron'].create({
+        daily_vals = {
             'name': 'WhatsApp Full Data Sync (Daily)',
-            'model_id': model_id.id,
+            'model_id': model_id,
             'state': 'code',
             'code': daily_sync_code,
             'interval_number': 1,
             'interval_type': 'days',
             'numbercall': -1,
             'active': False,
-            'user_id': admin_user.id,
+            'user_id': admin_user_id,
             'doall': False,
-        })
-        _logger.info("WhatsApp Integration: Created daily sync cron job")
+        }
+        
+        # One create() call for the three crons
+        crons = env['ir.cron'].create([hourly_vals, frequent_vals, daily_vals])
         
-        _logger.info("WhatsApp Integration: Successfully created all 3 cron jobs")
-        return hourly_cron + frequent_cron + daily_cron
+        # Register external ids so later checks take the xmlid path; noupdate keeps
+        # module updates from deleting records that are not in the data files
+        env['ir.model.data']._update_xmlids([
+            {'xml_id': f'{MODULE}.{xmlid}', 'record': cron, 'noupdate': True}
+            for xmlid, cron in zip(SYNC_CRON_XMLIDS, crons)
+        ])
+        _logger.info(f"WhatsApp Integration: Successfully created all {len(crons)} cron jobs")
+        return crons
         
     except Exception as e:
         _logger.error(f"WhatsApp Integration: Failed to create cron jobs: {str(e)}")
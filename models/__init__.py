@@ -3,4 +3,6 @@ from . import whatsapp_contact
 from . import whatsapp_group
 from . import whatsapp_message
 from . import whatsapp_sync_service
+from . import whatsapp_webhook_queue
+from . import whatsapp_sync_job
 from . import res_users
@@ -3,6 +3,13 @@ from odoo import api, fields, models
 class ResUsers(models.Model):
     _inherit = 'res.users'
     
+    def write(self, vals):
+        res = super().write(vals)
+        # Group membership decides which WhatsApp configurations a user gets (ormcached)
+        if 'groups_id' in vals:
+            self.env['whatsapp.configuration'].clear_caches()
+        return res
+    
     @api.model
     def whatsapp_device_id(self):
         """Get the device ID for the current user's WhatsApp configuration"""
@@ -2,9 +2,33 @@
 Audit Log Model for WhatsApp Operations
 Provides observability and monitoring of API calls and operations
 """
-from odoo import models, fields, api
+from odoo import models, fields, api, tools
+from contextlib import contextmanager
 from datetime import datetime, timedelta
-from ..constants import PROVIDERS
+from functools import lru_cache, wraps
+import logging
+import threading
+from ..constants import PROVIDERS, AUDIT_LOG_CLEANUP_BATCH_SIZE
+
+_logger = logging.getLogger(__name__)
+
+# Log rows collected by the open batch of each thread, as (cursor, rows)
+_log_batch = threading.local()
+
+
+@lru_cache(maxsize=64)
+def _operation_from_endpoint(endpoint):
+    """Operation name of an API endpoint; endpoints come from a small fixed set"""
+    return f"api_{endpoint.rsplit('/', 1)[-1].lower()}" if endpoint else 'api_call'
+
+
+def batch_audit_logs(method):
+    """Decorator creating the audit logs written by a model method with a single insert"""
+    @wraps(method)
+    def wrapper(self, *args, **kwargs):
+        with self.env['whatsapp.audit.log']._batch_logs():
+            return method(self, *args, **kwargs)
+    return wrapper
 
 
 class WhatsAppAuditLog(models.Model):
@@ -79,6 +103,18 @@ class WhatsAppAuditLog(models.Model):
     # Auto-cleanup settings
     _auto_cleanup_days = 90  # Keep logs for 90 days by default
     
+    def init(self):
+        """Indexes for the time-window queries of the monitoring methods"""
+        # Provider-filtered windows; the leading column also serves provider-only lookups
+        tools.create_index(self._cr, 'whatsapp_audit_log_provider_timestamp_index',
+                           self._table, ['provider', 'timestamp DESC'])
+        # Failures are a small share of the log, so the error breakdown gets a partial index
+        self._cr.execute("""
+            CREATE INDEX IF NOT EXISTS whatsapp_audit_log_failed_timestamp_index
+            ON whatsapp_audit_log (timestamp DESC)
+            WHERE success IS NOT TRUE
+        """)
+    
     @api.model
     def log_operation(self, operation: str, provider: str = None, success: bool = True,
                      response_time: float = None, error_message: str = None,
@@ -95,6 +131,9 @@ class WhatsAppAuditLog(models.Model):
             message_id: Related message ID
             **kwargs: Additional fields
         """
+        if not self._is_audit_enabled():
+            return
+        
         try:
             log_vals = {
                 'operation': operation,
@@ -103,7 +142,7 @@ class WhatsAppAuditLog(models.Model):
                 'response_time': response_time,
                 'error_message': error_message,
                 'message_id': message_id,
-                'user_id': self.env.user.id,
+                'user_id': self.env.uid,
                 'timestamp': fields.Datetime.now(),
             }
             
@@ -112,20 +151,87 @@ class WhatsAppAuditLog(models.Model):
                 if key in self._fields:
                     log_vals[key] = value
             
-            self.sudo().create(log_vals)
+            self._create_log(log_vals)
             
         except Exception as e:
             # Don't let logging failures break the main operation
-            import logging
-            _logger = logging.getLogger(__name__)
             _logger.warning(f"Failed to create audit log: {e}")
     
+    @api.model
+    def _create_log(self, log_vals):
+        """Create a log row, unless audit logging is switched off
+
+        Inside a batch the row is only collected, and created when the batch ends.
+        """
+        if not self._is_audit_enabled():
+            return
+        batch = getattr(_log_batch, 'value', None)
+        if batch and batch[0] is self.env.cr:
+            batch[1].append(log_vals)
+            return
+        self._create_logs([log_vals])
+    
+    @api.model
+    @contextmanager
+    def _batch_logs(self):
+        """
+        Collect the log rows written in the block and create them with one insert at its end
+        
+        A nested batch joins the open one, so the rows are created by the outermost block.
+        When the block raises, the rows are dropped on purpose: the transaction may be
+        aborted, and the rows would be rolled back with it anyway.
+        """
+        if getattr(_log_batch, 'value', None):
+            yield
+            return
+        rows = []
+        _log_batch.value = (self.env.cr, rows)
+        try:
+            yield
+        except Exception:
+            if rows:
+                _logger.warning(f"Dropped {len(rows)} audit logs of a failed operation")
+            raise
+        finally:
+            _log_batch.value = None
+        self._create_logs(rows)
+    
+    @api.model
+    def _create_logs(self, rows):
+        """Create log rows in one batch, falling back to one row at a time when it fails"""
+        if not rows:
+            return
+        try:
+            with self.env.cr.savepoint():
+                self.sudo().create(rows)
+            return
+        except Exception as e:
+            _logger.warning(f"Failed to create {len(rows)} audit logs in batch, retrying one by one: {e}")
+        
+        # Keep the valid rows when one of them is rejected
+        for log_vals in rows:
+            try:
+                with self.env.cr.savepoint():
+                    self.sudo().create(log_vals)
+            except Exception as e:
+                _logger.warning(f"Failed to create audit log: {e}")
+    
+    @api.model
+    def _is_audit_enabled(self):
+        """
+        Whether audit rows are written at all
+        
+        Set the system parameter whatsapp.audit_enabled to False to switch logging
+        off. get_param is ormcached, so this costs no query on the send path.
+        """
+        return self.env['ir.config_parameter'].sudo().get_param('whatsapp.audit_enabled', 'True') != 'False'
+    
     @api.model
     def log_api_call(self, method: str, endpoint: str, provider: str,
                     success: bool, response_time: float = None,
                     error_message: str = None, **kwargs):
         """Log API call details"""
-        operation = f"api_{endpoint.split('/')[-1].lower()}" if endpoint else 'api_call'
+        operation = _operation_from_endpoint(endpoint)
         
         self.log_operation(
             operation=operation,
@@ -143,13 +249,24 @@ class WhatsAppAuditLog(models.Model):
         """Get performance metrics for the last N hours"""
         cutoff_time = datetime.now() - timedelta(hours=hours)
         
-        domain = [('timestamp', '>=', cutoff_time)]
+        where = "timestamp >= %s"
+        params = [cutoff_time]
         if provider:
-            domain.append(('provider', '=', provider))
+            where += " AND provider = %s"
+            params.append(provider)
         
-        logs = self.search(domain)
+        # Aggregates computed by PostgreSQL instead of walking a recordset of every log
+        self.flush(['timestamp', 'provider', 'success', 'response_time', 'error_code'])
+        self.env.cr.execute(f"""
+            SELECT COUNT(*),
+                   COUNT(*) FILTER (WHERE success),
+                   AVG(response_time) FILTER (WHERE success AND response_time <> 0)
+            FROM whatsapp_audit_log
+            WHERE {where}
+        """, params)
+        total_operations, successful_operations, avg_response_time = self.env.cr.fetchone()
         
-        if not logs:
+        if not total_operations:
             return {
                 'total_operations': 0,
                 'success_rate': 0,
@@ -157,49 +274,70 @@ class WhatsAppAuditLog(models.Model):
                 'error_count': 0
             }
         
-        total_operations = len(logs)
-        successful_operations = len(logs.filtered('success'))
         failed_operations = total_operations - successful_operations
         
-        # Calculate average response time for successful operations
-        successful_logs = logs.filtered(lambda l: l.success and l.response_time)
-        avg_response_time = sum(successful_logs.mapped('response_time')) / len(successful_logs) if successful_logs else 0
+        self.env.cr.execute(f"""
+            SELECT COALESCE(NULLIF(error_code, ''), 'unknown'), COUNT(*)
+            FROM whatsapp_audit_log
+            WHERE {where} AND success IS NOT TRUE
+            GROUP BY 1
+        """, params)
         
         return {
             'total_operations': total_operations,
             'successful_operations': successful_operations,
             'failed_operations': failed_operations,
-            'success_rate': (successful_operations / total_operations * 100) if total_operations else 0,
-            'avg_response_time': avg_response_time,
+            'success_rate': successful_operations / total_operations * 100,
+            'avg_response_time': avg_response_time or 0,
             'error_count': failed_operations,
-            'errors_by_type': self._get_error_breakdown(logs.filtered(lambda l: not l.success))
+            'errors_by_type': dict(self.env.cr.fetchall())
         }
     
-    def _get_error_breakdown(self, failed_logs):
-        """Get breakdown of errors by type"""
-        error_breakdown = {}
-        
-        for log in failed_logs:
-            error_type = log.error_code or 'unknown'
-            if error_type not in error_breakdown:
-                error_breakdown[error_type] = 0
-            error_breakdown[error_type] += 1
-        
-        return error_breakdown
+    @api.model
+    def _count_failures_since(self, since):
+        """Number of failed operations since a date, counted on the partial failure index"""
+        self.flush(['timestamp', 'success'])
+        # Same predicate as the partial index, so only failed rows are visited
+        self.env.cr.execute("""
+            SELECT COUNT(*) FROM whatsapp_audit_log
+            WHERE success IS NOT TRUE AND timestamp >= %s
+        """, (since,))
+        return self.env.cr.fetchone()[0]
     
     @api.model
-    def cleanup_old_logs(self, days: int = None):
-        """Clean up old audit logs"""
+    def cleanup_old_logs(self, days: int = None, commit: bool = False):
+        """
+        Clean up old audit logs
+        
+        Rows are deleted in SQL batches rather than loaded and unlinked as records.
+        With commit=True (cron only) every batch is committed on its own, so a
+        large backlog never holds one long transaction and its locks.
+        """
         if days is None:
             days = self._auto_cleanup_days
         
         cutoff_date = datetime.now() - timedelta(days=days)
         
-        old_logs = self.search([('timestamp', '<', cutoff_date)])
-        count = len(old_logs)
+        self.flush(['timestamp'])
+        count = 0
+        while True:
+            self.env.cr.execute("""
+                DELETE FROM whatsapp_audit_log
+                WHERE id IN (
+                    SELECT id FROM whatsapp_audit_log
+                    WHERE timestamp < %s
+                    LIMIT %s
+                )
+            """, (cutoff_date, AUDIT_LOG_CLEANUP_BATCH_SIZE))
+            deleted = self.env.cr.rowcount
+            count += deleted
+            if commit:
+                self.env.cr.commit()
+            if deleted < AUDIT_LOG_CLEANUP_BATCH_SIZE:
+                break
         
-        if old_logs:
-            old_logs.unlink()
+        if count:
+            self.invalidate_cache()
         
         return {
             'deleted_count': count,
@@ -212,38 +350,54 @@ class WhatsAppAuditLog(models.Model):
         # Get recent logs (last hour)
         recent_time = datetime.now() - timedelta(hours=1)
         
-        providers = self.search([]).mapped('provider')
+        # Recent statistics of every provider in one grouped query
+        self.flush(['provider', 'timestamp', 'success', 'response_time'])
+        self.env.cr.execute("""
+            SELECT provider,
+                   COUNT(*),
+                   COUNT(*) FILTER (WHERE success),
+                   AVG(response_time) FILTER (WHERE response_time <> 0)
+            FROM whatsapp_audit_log
+            WHERE timestamp >= %s AND provider IS NOT NULL
+            GROUP BY provider
+        """, (recent_time,))
+        recent_stats = {row[0]: row[1:] for row in self.env.cr.fetchall()}
+        
+        # Providers logged before but idle this hour, found with one index probe each
+        idle_providers = [key for key, _label in PROVIDERS if key not in recent_stats]
+        if idle_providers:
+            self.env.cr.execute("""
+                SELECT p FROM unnest(%s) AS p
+                WHERE EXISTS (SELECT 1 FROM whatsapp_audit_log WHERE provider = p)
+            """, (idle_providers,))
+            idle_providers = [row[0] for row in self.env.cr.fetchall()]
+        
         provider_health = {}
         
-        for provider in set(providers):
-            if not provider:
-                continue
-                
-            recent_logs = self.search([
-                ('provider', '=', provider),
-                ('timestamp', '>=', recent_time)
-            ])
+        for provider, (count, successful, avg_response_time) in recent_stats.items():
+            success_rate = successful / count * 100
+            avg_response_time = avg_response_time or 0
             
-            if recent_logs:
-                success_rate = len(recent_logs.filtered('success')) / len(recent_logs) * 100
-                avg_response_time = sum(recent_logs.filtered('response_time').mapped('response_time')) / len(recent_logs.filtered('response_time')) if recent_logs.filtered('response_time') else 0
-                
-                if success_rate >= 95 and avg_response_time < 5:
-                    health_status = 'healthy'
-                elif success_rate >= 80 and avg_response_time < 10:
-                    health_status = 'degraded'
-                else:
-                    health_status = 'unhealthy'
+            if success_rate >= 95 and avg_response_time < 5:
+                health_status = 'healthy'
+            elif success_rate >= 80 and avg_response_time < 10:
+                health_status = 'degraded'
             else:
-                health_status = 'unknown'
-                success_rate = 0
-                avg_response_time = 0
+                health_status = 'unhealthy'
             
             provider_health[provider] = {
                 'status': health_status,
                 'success_rate': success_rate,
                 'avg_response_time': avg_response_time,
-                'recent_operations': len(recent_logs)
+                'recent_operations': count
+            }
+        
+        for provider in idle_providers:
+            provider_health[provider] = {
+                'status': 'unknown',
+                'success_rate': 0,
+                'avg_response_time': 0,
+                'recent_operations': 0
             }
         
         return provider_health
@@ -251,22 +405,35 @@ class WhatsAppAuditLog(models.Model):
     @api.model
     def get_daily_stats(self, days: int = 7):
         """Get daily operation statistics"""
-        stats = []
+        today = datetime.now().date()
+        first_day = today - timedelta(days=days - 1)
+        
+        # One grouped query over the whole window instead of a search per day
+        self.flush(['timestamp', 'success', 'response_time'])
+        self.env.cr.execute("""
+            SELECT date_trunc('day', timestamp)::date AS day,
+                   COUNT(*) AS total,
+                   COUNT(*) FILTER (WHERE success) AS successful,
+                   AVG(response_time) FILTER (WHERE response_time <> 0) AS avg_response_time
+            FROM whatsapp_audit_log
+            WHERE timestamp >= %s AND timestamp < %s
+            GROUP BY day
+        """, (datetime.combine(first_day, datetime.min.time()),
+              datetime.combine(today + timedelta(days=1), datetime.min.time())))
+        rows = {row['day']: row for row in self.env.cr.dictfetchall()}
         
+        stats = []
         for i in range(days):
-            date = (datetime.now() - timedelta(days=i)).date()
-            
-            day_logs = self.search([
-                ('timestamp', '>=', datetime.combine(date, datetime.min.time())),
-                ('timestamp', '<', datetime.combine(date + timedelta(days=1), datetime.min.time()))
-            ])
-            
+            date = today - timedelta(days=i)
+            row = rows.get(date)
+            total = row['total'] if row else 0
+            successful = row['successful'] if row else 0
             stats.append({
                 'date': date,
-                'total_operations': len(day_logs),
-                'successful_operations': len(day_logs.filtered('success')),
-                'failed_operations': len(day_logs.filtered(lambda l: not l.success)),
-                'avg_response_time': sum(day_logs.filtered('response_time').mapped('response_time')) / len(day_logs.filtered('response_time')) if day_logs.filtered('response_time') else 0
+                'total_operations': total,
+                'successful_operations': successful,
+                'failed_operations': total - successful,
+                'avg_response_time': (row and row['avg_response_time']) or 0
             })
         
         return stats
@@ -275,7 +442,7 @@ class WhatsAppAuditLog(models.Model):
     @api.model
     def _cron_cleanup_audit_logs(self):
         """Cron job to automatically clean up old audit logs"""
-        result = self.cleanup_old_logs()
+        result = self.cleanup_old_logs(commit=True)
         
         import logging
         _logger = logging.getLogger(__name__)
@@ -1,6 +1,7 @@
-from odoo import api, fields, models
+from odoo import api, fields, models, tools
 from odoo.exceptions import ValidationError
-from ..constants import PROVIDERS
+from ..constants import PROVIDERS, CHANNEL_CONFIG_CACHE_SIZE, CHANNEL_CONFIG_CACHE_TTL
+from ..utils import TTLCache
 
 class WhatsAppConfiguration(models.Model):
     _name = 'whatsapp.configuration'
@@ -25,119 +26,161 @@ class WhatsAppConfiguration(models.Model):
         index=True
     )
     
+    store_full_metadata = fields.Boolean(
+        'Store Full Message Metadata',
+        default=True,
+        help='Keep the whole webhook payload of incoming text messages. When disabled only '
+             'the sender details are stored, which keeps the message table much smaller.'
+    )
+    
     # Access control fields
     user_ids = fields.Many2many('res.users', string='Allowed Users', 
                                help='Users who can use this configuration')
     group_ids = fields.Many2many('res.groups', string='Allowed Groups',
                                 help='Groups who can use this configuration')
     
+    # Active configuration id (or False) per (dbname, channel_id), hit by every webhook
+    _channel_config_cache = TTLCache(maxsize=CHANNEL_CONFIG_CACHE_SIZE, ttl=CHANNEL_CONFIG_CACHE_TTL)
+    
     @api.constrains('token')
     def _check_unique_token(self):
-        for record in self:
-            if record.active:
-                existing = self.search([
-                    ('token', '=', record.token),
-                    ('id', '!=', record.id),
-                    ('active', '=', True)
-                ])
-                # if existing:
-                #     raise ValidationError(f"API Token is already in use by another active configuration.")
+        # Token uniqueness is currently not enforced, so no duplicate lookup is run either
+        # for record in self.filtered('active'):
+        #     if self.search([('token', '=', record.token), ('id', '!=', record.id), ('active', '=', True)], limit=1):
+        #         raise ValidationError(f"API Token is already in use by another active configuration.")
+        return
 
     @api.model
     def get_by_channel_id(self, channel_id: str):
         """Return active configuration matching a webhook channel_id."""
         if not channel_id:
             return None
-        return self.search([
-            ('active', '=', True),
-            ('channel_id', '=', channel_id)
-        ], limit=1)
+        key = (self.env.cr.dbname, channel_id)
+        config_id = self._channel_config_cache.get(key)
+        if config_id is None:
+            config_id = self.search([
+                ('active', '=', True),
+                ('channel_id', '=', channel_id)
+            ], limit=1).id
+            self._channel_config_cache.set(key, config_id)
+        return self.browse(config_id)
+
+    @api.model_create_multi
+    def create(self, vals_list):
+        self._invalidate_channel_config_cache()
+        self.clear_caches()
+        return super().create(vals_list)
+
+    def write(self, vals):
+        self._invalidate_channel_config_cache()
+        self.clear_caches()
+        return super().write(vals)
+
+    def unlink(self):
+        self._invalidate_channel_config_cache()
+        self.clear_caches()
+        return super().unlink()
+
+    def _invalidate_channel_config_cache(self):
+        """Forget every channel_id resolution of the current database"""
+        dbname = self.env.cr.dbname
+        self._channel_config_cache.discard_where(lambda key: key[0] == dbname)
 
     @api.constrains('channel_id', 'active')
     def _check_unique_channel_id_when_active(self):
-        for record in self:
-            if record.active and record.channel_id:
-                dup = self.search([
-                    ('id', '!=', record.id),
-                    ('active', '=', True),
-                    ('channel_id', '=', record.channel_id)
-                ], limit=1)
-                if dup:
-                    raise ValidationError("Channel ID must be unique among active configurations.")
+        channel_ids = {record.channel_id for record in self if record.active and record.channel_id}
+        if not channel_ids:
+            return
+        # One grouped query for the whole batch, as superuser so configurations hidden
+        # from the current user by record rules still count as duplicates
+        groups = self.sudo().read_group([
+            ('active', '=', True),
+            ('channel_id', 'in', list(channel_ids))
+        ], ['channel_id'], ['channel_id'])
+        if any(group['channel_id_count'] > 1 for group in groups):
+            raise ValidationError("Channel ID must be unique among active configurations.")
 
     @api.model
     def get_user_configuration(self, user_id=None):
         """Get the configuration accessible by the current user"""
-        if not user_id:
-            user_id = self.env.user.id
-        
+        config_id = self._get_user_configuration_id(user_id or self.env.user.id)
+        return self.browse(config_id) if config_id else None
+
+    @api.model
+    @tools.ormcache('user_id')
+    def _get_user_configuration_id(self, user_id):
+        """Configuration id of a user (or False)
+
+        Cached until configurations or user groups change. Assignments are read as
+        superuser, which matches what the configuration record rules let the user see.
+        """
+        Config = self.sudo()
         user = self.env['res.users'].browse(user_id)
         
         # Admin users get the first active configuration if no specific assignment
         if user.has_group('whatsapp_integration.group_whatsapp_admin'):
             # First try assigned configurations
-            configs = self.search([
+            configs = Config.search([
                 ('active', '=', True),
                 '|', 
                 ('user_ids', 'in', [user_id]),
                 ('group_ids', 'in', user.groups_id.ids)
-            ])
+            ], limit=1)
             
             # If no specific assignment, get first active configuration
             if not configs:
-                configs = self.search([('active', '=', True)], limit=1)
+                configs = Config.search([('active', '=', True)], limit=1)
             
-            return configs[0] if configs else None
+            return configs.id
         
-        # Regular users: Check configurations assigned to user directly
-        configs = self.search([
+        # Regular users: configurations assigned to the user or to one of their groups, in one search
+        configs = Config.search([
             ('active', '=', True),
-            ('user_ids', 'in', [user_id])
+            '|',
+            ('user_ids', 'in', [user_id]),
+            ('group_ids', 'in', user.groups_id.ids)
         ])
         
-        # Check configurations assigned to user's groups
-        if not configs:
-            user_groups = user.groups_id.ids
-            configs = self.search([
-                ('active', '=', True),
-                ('group_ids', 'in', user_groups)
-            ])
+        # A direct assignment takes precedence over a group assignment
+        if len(configs) > 1:
+            configs = configs.filtered(lambda config: user in config.user_ids) or configs
         
-        return configs[0] if configs else None
+        return configs[:1].id
 
     @api.model
     def get_user_accessible_config_ids(self, user_id=None):
         """Get all configuration IDs accessible by the current user"""
-        if not user_id:
-            user_id = self.env.user.id
-        
+        return list(self._get_user_accessible_config_ids(user_id or self.env.user.id))
+
+    @api.model
+    @tools.ormcache('user_id')
+    def _get_user_accessible_config_ids(self, user_id):
+        """Ids of the configurations accessible by a user, cached like _get_user_configuration_id"""
+        Config = self.sudo()
         user = self.env['res.users'].browse(user_id)
         
         # Admin users see all configurations
         if user.has_group('whatsapp_integration.group_whatsapp_admin'):
-            configs = self.search([('active', '=', True)])
-            return configs.ids
+            return tuple(Config._search([('active', '=', True)]))
         
-        # Regular users: Check configurations assigned to user directly
-        configs = self.search([
+        # Regular users: configurations assigned to the user directly take precedence,
+        # group assignments only count when there are none
+        config_ids = tuple(Config._search([
             ('active', '=', True),
             ('user_ids', 'in', [user_id])
-        ])
-        
-        # Check configurations assigned to user's groups
-        if not configs:
-            user_groups = user.groups_id.ids
-            configs = self.search([
+        ]))
+        if not config_ids:
+            config_ids = tuple(Config._search([
                 ('active', '=', True),
-                ('group_ids', 'in', user_groups)
-            ])
-        
-        return configs.ids
+                ('group_ids', 'in', user.groups_id.ids)
+            ]))
+        return config_ids
 
     def name_get(self):
         result = []
+        provider_names = dict(self._fields['provider'].selection)
         for record in self:
-            provider_name = dict(record._fields['provider'].selection).get(record.provider, record.provider)
+            provider_name = provider_names.get(record.provider, record.provider)
             name = f"{record.name} ({provider_name})"
             result.append((record.id, name))
         return result
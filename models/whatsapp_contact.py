@@ -1,9 +1,20 @@
-from odoo import models, fields, api, SUPERUSER_ID
+from odoo import models, fields, api, tools
 import logging
-from ..constants import PROVIDERS
+from collections import defaultdict
+from itertools import islice
+from ..constants import PROVIDERS, WEBHOOK_ID_CACHE_SIZE, WEBHOOK_ID_CACHE_TTL, CONTACT_SYNC_BATCH_SIZE
+from ..exceptions import WhatsAppAPIError
+from ..utils import TTLCache, normalize_phone_digits
 
 _logger = logging.getLogger(__name__)
 
+# Fields whose writes are bookkeeping and do not count as a change of the contact
+_TECHNICAL_FIELDS = frozenset(['synced_at', 'updated_at'])
+
+# Columns of existing contacts the sync compares against the API data
+_SYNC_READ_FIELDS = ['contact_id', 'provider', 'name', 'pushname', 'isWAContact',
+                     'is_phone_contact', 'is_chat_contact']
+
 class WhatsAppContact(models.Model):
     _name = 'whatsapp.contact'
     _description = 'WhatsApp Contact'
@@ -36,7 +47,7 @@ class WhatsAppContact(models.Model):
     is_chat_contact = fields.Boolean('Chat Contact', default=False, help='Contact from chat conversations')
     
     # Configuration tracking for permission control
-    configuration_id = fields.Many2one('whatsapp.configuration', string='Configuration', 
+    configuration_id = fields.Many2one('whatsapp.configuration', string='Configuration',
                                       help='WhatsApp configuration this contact belongs to')
     
     # Relationships - updated for clean WHAPI schema
@@ -46,61 +57,88 @@ class WhatsAppContact(models.Model):
     
     # Computed fields
     sent_message_count = fields.Integer('Sent Messages', compute='_compute_message_counts')
-    group_count = fields.Integer('Group Count', compute='_compute_group_count')
+    group_count = fields.Integer('Group Count', compute='_compute_group_count', compute_sudo=True)
     
     _sql_constraints = [
         ('contact_id_unique', 'unique(contact_id)', 'Contact ID must be unique!'),
     ]
     
-    @api.model
-    def search(self, args, offset=0, limit=None, order=None, count=False):
-        """Override search to filter by user's accessible configurations"""
-        # Skip filtering for superuser or when explicitly requested
-        if self.env.user.id == SUPERUSER_ID or self.env.context.get('skip_config_filter'):
-            return super().search(args, offset=offset, limit=limit, order=order, count=count)
-
-        # Only apply filtering for non-admin users
-        if not self.env.user.has_group('whatsapp_integration.group_whatsapp_admin'):
-            config_ids = self.env['whatsapp.configuration'].get_user_accessible_config_ids()
-            if config_ids:
-                # Add configuration filter to the domain
-                config_domain = [('configuration_id', 'in', config_ids)]
-                args = args + config_domain if args else config_domain
-            else:
-                # User has no accessible configurations, return empty set
-                args = [('id', '=', False)]
-        
-        return super().search(args, offset=offset, limit=limit, order=order, count=count)
+    # Record id per (dbname, WHAPI contact_id), used by the webhook preload
+    _webhook_id_cache = TTLCache(maxsize=WEBHOOK_ID_CACHE_SIZE, ttl=WEBHOOK_ID_CACHE_TTL)
+    
+    def init(self):
+        """Index for the configuration record rule"""
+        # The leading column serves the rule filter on its own, and lookups by contact_id
+        # under the rule can be answered from the index alone
+        tools.create_index(self._cr, 'whatsapp_contact_configuration_contact_index',
+                           self._table, ['configuration_id', 'contact_id'])
     
     @api.depends('name', 'pushname', 'phone', 'contact_id')
     def _compute_display_name(self):
         for record in self:
             # Priority: pushname > name > phone > contact_id
-            record.display_name = (
+            display_name = (
                 record.pushname or 
                 record.name or 
                 record.phone or 
                 record.contact_id or 
                 'Unknown'
             )
+            # Assigning marks the column for UPDATE even when nothing changed,
+            # which is the common case when a sync rewrites every contact
+            if record.display_name != display_name:
+                record.display_name = display_name
     
     @api.depends('message_ids')
     def _compute_message_counts(self):
+        # One grouped count for the whole batch instead of a search_count per contact
+        messages = self.env['whatsapp.message']
+        domain = [('contact_id', 'in', self._origin.ids)] + messages._get_config_filter_domain()
+        groups = messages.read_group(domain, ['contact_id'], ['contact_id'])
+        counts = {group['contact_id'][0]: group['contact_id_count'] for group in groups}
         for contact in self:
-            # Count messages for this contact using clean WHAPI schema
-            contact.sent_message_count = self.env['whatsapp.message'].search_count([
-                ('contact_id', '=', contact.id)
-            ])
+            contact.sent_message_count = counts.get(contact._origin.id, 0)
     
     @api.depends('group_ids')
     def _compute_group_count(self):
+        # Count saved contacts in SQL instead of loading every group; new records
+        # (onchange) only exist in the cache
+        counts = self._get_group_counts(self.filtered('id').ids)
         for contact in self:
-            contact.group_count = len(contact.group_ids)
+            contact.group_count = counts.get(contact.id, 0) if contact.id else len(contact.group_ids)
+    
+    @api.model
+    def _get_group_counts(self, contact_ids):
+        """Map contact ids to their number of groups with one grouped query"""
+        if not contact_ids:
+            return {}
+        self.flush(['group_ids'])
+        self.env.cr.execute("""
+            SELECT contact_id, COUNT(group_id) FROM whatsapp_group_contact_rel
+            WHERE contact_id = ANY(%s)
+            GROUP BY contact_id
+        """, (list(contact_ids),))
+        return dict(self.env.cr.fetchall())
     
     def write(self, vals):
         """Override write to update timestamp"""
-        vals['updated_at'] = fields.Datetime.now()
+        if not vals:
+            return True
+        if not _TECHNICAL_FIELDS.issuperset(vals):
+            vals = dict(vals, updated_at=fields.Datetime.now())
+        if 'contact_id' in vals:
+            self._invalidate_webhook_id_cache()
         return super().write(vals)
+
+    def unlink(self):
+        self._invalidate_webhook_id_cache()
+        return super().unlink()
+
+    def _invalidate_webhook_id_cache(self):
+        """Drop cached WHAPI id -> record id entries of these contacts"""
+        dbname = self.env.cr.dbname
+        keys = set(self.mapped('contact_id'))
+        self._webhook_id_cache.discard_where(lambda key: key[0] == dbname and key[1] in keys)
     
     @api.model
     def create_from_api_data(self, api_data, match_by_phone=True, provider='whapi'):
@@ -111,24 +149,8 @@ class WhatsAppContact(models.Model):
             _logger.warning("No accessible WhatsApp configuration found for current user")
             return False
             
-        if provider == 'whapi':
-            # WHAPI format - clean mapping
-            contact_id = api_data.get('id', '')
-            pushname = api_data.get('pushname', '')
-            name = api_data.get('name', '')
-            # In WHAPI, phone might not always be available, use contact_id as fallback
-            phone = contact_id if contact_id.isdigit() else ''
-            # Get contact type flags
-            is_phone_contact = api_data.get('is_phone_contact', False)
-            is_chat_contact = api_data.get('is_chat_contact', False)
-        else:
-            # Wassenger format - for backward compatibility
-            contact_id = api_data.get('phone', '')
-            phone = api_data.get('phone', '')
-            name = api_data.get('name', '')
-            pushname = ''
-            is_phone_contact = True
-            is_chat_contact = False
+        contact_id, name, pushname, phone, is_phone_contact, is_chat_contact = \
+            self._parse_api_contact(api_data, provider)
         
         if not contact_id:
             _logger.warning(f"Skipping contact creation due to missing contact_id: {api_data}")
@@ -169,36 +191,204 @@ class WhatsAppContact(models.Model):
 
         # Create new contact
         try:
+            return self.create(self._prepare_create_vals(api_data, provider, config))
+            
+        except Exception as e:
+            _logger.error(f"Failed to create contact for contact_id {contact_id}: {e}")
+            return False
+    
+    @api.model
+    def _parse_api_contact(self, api_data, provider):
+        """Contact id, name, pushname, phone and type flags of an API contact"""
+        if provider == 'whapi':
+            # WHAPI format - clean mapping
+            contact_id = api_data.get('id', '')
+            # In WHAPI, phone might not always be available, use contact_id as fallback
+            phone = contact_id if contact_id.isdigit() else ''
+            return (
+                contact_id,
+                api_data.get('name', ''),
+                api_data.get('pushname', ''),
+                phone,
+                api_data.get('is_phone_contact', False),
+                api_data.get('is_chat_contact', False),
+            )
+        # Wassenger format - for backward compatibility
+        contact_id = api_data.get('phone', '')
+        return contact_id, api_data.get('name', ''), '', contact_id, True, False
+    
+    @api.model
+    def _prepare_create_vals(self, api_data, provider, config, synced_at=None):
+        """Values of a new contact built from API data"""
+        contact_id, name, pushname, phone, is_phone_contact, is_chat_contact = \
+            self._parse_api_contact(api_data, provider)
+        vals = {
+            'contact_id': contact_id,
+            'synced_at': synced_at or fields.Datetime.now(),
+            'provider': provider,
+            'isWAContact': True,
+            'is_phone_contact': is_phone_contact,
+            'is_chat_contact': is_chat_contact,
+            'configuration_id': config.id,  # Link to configuration
+        }
+        
+        if provider == 'whapi':
+            # WHAPI specific fields - only what's actually available
+            vals.update({
+                'pushname': pushname,
+                'name': name,
+                'phone': phone,
+            })
+        else:
+            # Wassenger specific fields - for backward compatibility
+            vals.update({
+                'name': name or contact_id,
+                'phone': phone,
+                'wid': api_data.get('wid', contact_id),
+            })
+        return vals
+    
+    @api.model
+    def _iter_whapi_contacts(self, api_service, count=500):
+        """Phone contacts, then individual chat contacts, fetched one WHAPI page at a time"""
+        # 1. Get phone contacts (real contacts from user's phone)
+        _logger.info("Syncing phone contacts from WHAPI...")
+        offset = 0
+        while True:
+            api_contacts = api_service.get_contacts(count=count, offset=offset).get('contacts', [])
+            for contact in api_contacts:
+                contact['is_phone_contact'] = True
+                yield contact
+            if len(api_contacts) < count:
+                break
+            offset += count
+        
+        # 2. Get chat contacts (people you've chatted with)
+        _logger.info("Syncing chat contacts from WHAPI...")
+        offset = 0
+        while True:
+            api_chats = api_service.get_chats(count=count, offset=offset).get('chats', [])
+            for chat in api_chats:
+                # Only process individual chats (not groups)
+                if chat.get('type') == 'chat':
+                    yield {
+                        'id': chat.get('id', ''),
+                        'name': chat.get('name', ''),
+                        'pushname': chat.get('pushname', ''),
+                        'is_phone_contact': False,
+                        'is_chat_contact': True
+                    }
+            if len(api_chats) < count:
+                break
+            offset += count
+    
+    @api.model
+    def _sync_contact_batch(self, api_contacts, config, synced_at):
+        """Create or update a batch of API contacts
+
+        Returns the number of contacts created and the errors met. A contact repeated in
+        a later batch finds the record created here and is merged into it.
+        """
+        provider = config.provider
+        errors = []
+        
+        # The same contact can be both a phone and a chat contact, merge its entries
+        # the way consecutive updates did: flags add up, later names win when set
+        merged = {}
+        for api_contact in api_contacts:
+            contact_id, name, pushname, phone, is_phone_contact, is_chat_contact = \
+                self._parse_api_contact(api_contact, provider)
+            if not contact_id:
+                continue
+            entry = merged.get(contact_id)
+            if entry is None:
+                merged[contact_id] = dict(api_contact, is_phone_contact=is_phone_contact,
+                                          is_chat_contact=is_chat_contact)
+                continue
+            entry['is_phone_contact'] = entry['is_phone_contact'] or is_phone_contact
+            entry['is_chat_contact'] = entry['is_chat_contact'] or is_chat_contact
+            if name:
+                entry['name'] = name
+            if pushname:
+                entry['pushname'] = pushname
+        
+        # One query for every known contact instead of one per API contact, reading
+        # only the columns the update compares
+        existing_by_id = {
+            row['contact_id']: row
+            for row in self.search_read([('contact_id', 'in', list(merged))], _SYNC_READ_FIELDS)
+        }
+        
+        to_create = []
+        ids_by_vals = defaultdict(list)
+        for contact_id, api_contact in merged.items():
+            existing = existing_by_id.get(contact_id)
+            if not existing:
+                to_create.append(self._prepare_create_vals(api_contact, provider, config, synced_at))
+                continue
+            vals = self._prepare_sync_update_vals(existing, api_contact, provider)
+            ids_by_vals[frozenset(vals.items())].append(existing['id'])
+        
+        # Contacts sharing the same new values are written together
+        for vals_items, contact_ids in ids_by_vals.items():
+            vals = dict(vals_items, synced_at=synced_at)
+            try:
+                with self.env.cr.savepoint():
+                    self.browse(contact_ids).write(vals)
+            except Exception as e:
+                error_msg = f"Error syncing {len(contact_ids)} contacts: {str(e)}"
+                errors.append(error_msg)
+                _logger.error(error_msg)
+        
+        synced_count, create_errors = self._create_synced_contacts(to_create)
+        return synced_count, errors + create_errors
+    
+    @api.model
+    def _prepare_sync_update_vals(self, existing, api_contact, provider):
+        """Values of an existing contact that change with the synced API data
+
+        existing is a record or a search_read row holding _SYNC_READ_FIELDS.
+        """
+        if provider == 'whapi':
             vals = {
-                'contact_id': contact_id,
-                'synced_at': fields.Datetime.now(),
                 'provider': provider,
+                'name': api_contact.get('name') or existing['name'],
+                'pushname': api_contact.get('pushname') or existing['pushname'],
                 'isWAContact': True,
-                'is_phone_contact': is_phone_contact,
-                'is_chat_contact': is_chat_contact,
-                'configuration_id': config.id,  # Link to configuration
+                'is_phone_contact': api_contact['is_phone_contact'] or existing['is_phone_contact'],
+                'is_chat_contact': api_contact['is_chat_contact'] or existing['is_chat_contact'],
             }
-            
-            if provider == 'whapi':
-                # WHAPI specific fields - only what's actually available
-                vals.update({
-                    'pushname': pushname,
-                    'name': name,
-                    'phone': phone,
-                })
-            else:
-                # Wassenger specific fields - for backward compatibility
-                vals.update({
-                    'name': name or contact_id,
-                    'phone': phone,
-                    'wid': api_data.get('wid', contact_id),
-                })
-            
-            return self.create(vals)
-            
+        else:
+            vals = {'provider': provider, 'name': api_contact.get('name') or existing['name']}
+        # Only keep the changes, so that the unchanged contacts share a single write
+        return {key: value for key, value in vals.items() if existing[key] != value}
+    
+    def _create_synced_contacts(self, vals_list):
+        """Insert new synced contacts with a single create()
+
+        Falls back to one insert per contact when the batch fails. Returns the number of
+        contacts created and the errors of the ones that could not be.
+        """
+        if not vals_list:
+            return 0, []
+        try:
+            with self.env.cr.savepoint():
+                return len(self.create(vals_list)), []
         except Exception as e:
-            _logger.error(f"Failed to create contact for contact_id {contact_id}: {e}")
-            return False
+            _logger.warning(f"Error creating {len(vals_list)} contacts in one batch, creating them one by one: {e}")
+        
+        created_count = 0
+        errors = []
+        for vals in vals_list:
+            try:
+                with self.env.cr.savepoint():
+                    self.create(vals)
+                created_count += 1
+            except Exception as e:
+                error_msg = f"Error syncing contact {vals['contact_id']}: {str(e)}"
+                errors.append(error_msg)
+                _logger.error(error_msg)
+        return created_count, errors
     
     def action_view_sent_messages(self):
         """Action to view messages for this contact"""
@@ -218,7 +408,9 @@ class WhatsAppContact(models.Model):
             'name': f'Groups - {self.display_name}',
             'res_model': 'whatsapp.group',
             'view_mode': 'tree,form',
-            'domain': [('participant_ids', 'in', [self.id])],
+            # Ids of the contact's groups, read from the relation table, instead of a
+            # participant_ids lookup the list view would re-run on every reload
+            'domain': [('id', 'in', self.group_ids.ids)],
         }
     
     def sync_contact_info(self):
@@ -298,17 +490,11 @@ class WhatsAppContact(models.Model):
                         }
                     }
                 
-                result = api_service.check_contacts_exist([phone_to_check])
-                contacts = result.get('contacts', [])
-                exists = False
-                if contacts:
-                    contact_result = contacts[0]
-                    exists = contact_result.get('status') == 'valid'
+                exists = bool(self._check_whatsapp_status_batch(api_service))
             else:
                 # Use Wassenger method
                 exists = api_service.check_number_exists(self.phone or self.contact_id)
-            
-            self.isWAContact = exists
+                self.isWAContact = exists
             message = 'Contact exists on WhatsApp' if exists else 'Contact not found on WhatsApp'
             return {
                 'type': 'ir.actions.client',
@@ -330,6 +516,72 @@ class WhatsAppContact(models.Model):
                 }
             }
     
+    def _check_whatsapp_status_batch(self, api_service):
+        """Check all contacts with a single WHAPI request and store the results
+
+        Contacts without a phone number or contact id, and numbers missing from the
+        response, are left untouched. A failed request raises without writing anything.
+        Returns the contacts found on WhatsApp.
+        """
+        # Phones and contact ids come as '+1 234...', '1234...' or '1234...@s.whatsapp.net'
+        numbers = {contact.id: normalize_phone_digits(contact.phone or contact.contact_id) for contact in self}
+        numbers = {contact_id: number for contact_id, number in numbers.items() if number}
+        if not numbers:
+            return self.browse()
+        
+        result = api_service.check_contacts_exist(list(set(numbers.values())))
+        if result.get('error'):
+            raise WhatsAppAPIError(f"WhatsApp status check failed: {result['error']}", provider='whapi')
+        statuses = {
+            normalize_phone_digits(contact.get('input')): contact.get('status') == 'valid'
+            for contact in result.get('contacts', [])
+        }
+        
+        # Two grouped writes instead of one per contact
+        valid = self.browse([contact_id for contact_id, number in numbers.items() if statuses.get(number)])
+        invalid = self.browse([contact_id for contact_id, number in numbers.items() if statuses.get(number) is False])
+        if valid:
+            valid.write({'isWAContact': True})
+        if invalid:
+            invalid.write({'isWAContact': False})
+        return valid
+    
+    def action_bulk_check_whatsapp_status(self):
+        """Bulk action to check the WhatsApp status of the selected contacts"""
+        config = self.env['whatsapp.configuration'].get_user_configuration()
+        if not config or config.provider != 'whapi':
+            return {
+                'type': 'ir.actions.client',
+                'tag': 'display_notification',
+                'params': {
+                    'title': 'Configuration Missing',
+                    'message': 'Bulk status checks need an accessible WHAPI configuration',
+                    'type': 'warning',
+                }
+            }
+        
+        try:
+            valid = self._check_whatsapp_status_batch(self.env['whapi.service'])
+        except Exception as e:
+            return {
+                'type': 'ir.actions.client',
+                'tag': 'display_notification',
+                'params': {
+                    'title': 'Check Failed',
+                    'message': str(e),
+                    'type': 'danger',
+                }
+            }
+        return {
+            'type': 'ir.actions.client',
+            'tag': 'display_notification',
+            'params': {
+                'title': 'WhatsApp Status',
+                'message': f'{len(valid)} of {len(self)} contacts exist on WhatsApp',
+                'type': 'success',
+            }
+        }
+    
     def send_message(self):
         """Open wizard to send message to this contact"""
         return {
@@ -363,136 +615,24 @@ class WhatsAppContact(models.Model):
             api_service = self.env['wassenger.api']
         
         try:
-            # Get contacts from API
-            if config and config.provider == 'whapi':
-                # WHAPI: Get both phone contacts and chat contacts
-                all_contacts = []
-                
-                # 1. Get phone contacts (real contacts from user's phone)
-                offset = 0
-                count = 500
-                
-                _logger.info("Syncing phone contacts from WHAPI...")
-                while True:
-                    result = api_service.get_contacts(count=count, offset=offset)
-                    api_contacts = result.get('contacts', [])
-                    
-                    if not api_contacts:
-                        break
-                    
-                    # Mark as phone contacts
-                    for contact in api_contacts:
-                        contact['is_phone_contact'] = True
-                    
-                    all_contacts.extend(api_contacts)
-                    
-                    if len(api_contacts) < count:
-                        break
-                    
-                    offset += count
-                
-                # 2. Get chat contacts (people you've chatted with)
-                offset = 0
-                _logger.info("Syncing chat contacts from WHAPI...")
-                while True:
-                    result = api_service.get_chats(count=count, offset=offset)
-                    api_chats = result.get('chats', [])
-                    
-                    if not api_chats:
-                        break
-                    
-                    # Convert chats to contact format and mark as chat contacts
-                    for chat in api_chats:
-                        # Only process individual chats (not groups)
-                        if chat.get('type') == 'chat':
-                            contact = {
-                                'id': chat.get('id', ''),
-                                'name': chat.get('name', ''),
-                                'pushname': chat.get('pushname', ''),
-                                'is_phone_contact': False,
-                                'is_chat_contact': True
-                            }
-                            all_contacts.append(contact)
-                    
-                    if len(api_chats) < count:
-                        break
-                    
-                    offset += count
+            # Contacts are processed page by page as the API returns them instead of
+            # collecting every contact first
+            if config.provider == 'whapi':
+                api_contacts = self._iter_whapi_contacts(api_service)
             else:
                 # Wassenger method
-                all_contacts = api_service.get_contacts()
-                for contact in all_contacts:
-                    contact['is_phone_contact'] = True
+                api_contacts = iter(api_service.get_contacts())
             
+            synced_at = fields.Datetime.now()
             synced_count = 0
             errors = []
-            
-            for api_contact in all_contacts:
-                if config and config.provider == 'whapi':
-                    # WHAPI format: clean field mapping
-                    contact_id = api_contact.get('id', '')
-                    name = api_contact.get('name', '')
-                    pushname = api_contact.get('pushname', '')
-                    is_phone_contact = api_contact.get('is_phone_contact', False)
-                    is_chat_contact = api_contact.get('is_chat_contact', False)
-                else:
-                    # Wassenger format
-                    contact_id = api_contact.get('phone', '')
-                    name = api_contact.get('name', '')
-                    pushname = ''
-                    is_phone_contact = True
-                    is_chat_contact = False
-                
-                if not contact_id:
-                    continue
-                
-                try:
-                    # Use savepoint for each contact to isolate errors
-                    with self.env.cr.savepoint():
-                        existing = self.search([('contact_id', '=', contact_id)], limit=1)
-                        
-                        if not existing:
-                            # Create new contact with enhanced data
-                            contact_data = api_contact.copy()
-                            contact_data['is_phone_contact'] = is_phone_contact
-                            contact_data['is_chat_contact'] = is_chat_contact
-                            
-                            contact = self.create_from_api_data(contact_data, provider=config.provider if config else 'whapi')
-                            if contact:
-                                synced_count += 1
-                        else:
-                            # Update existing contact with clean fields
-                            update_vals = {
-                                'synced_at': fields.Datetime.now(),
-                                'provider': config.provider if config else 'whapi',
-                            }
-                            
-                            if config and config.provider == 'whapi':
-                                # WHAPI specific updates - only available fields
-                                update_vals.update({
-                                    'name': name or existing.name,
-                                    'pushname': pushname or existing.pushname,
-                                    'isWAContact': True,
-                                })
-                                
-                                # Update contact type flags if available
-                                if hasattr(existing, 'is_phone_contact'):
-                                    update_vals['is_phone_contact'] = is_phone_contact or getattr(existing, 'is_phone_contact', False)
-                                if hasattr(existing, 'is_chat_contact'):
-                                    update_vals['is_chat_contact'] = is_chat_contact or getattr(existing, 'is_chat_contact', False)
-                            else:
-                                # Wassenger specific updates
-                                update_vals.update({
-                                    'name': name or existing.name,
-                                })
-                            
-                            existing.write(update_vals)
-                            
-                except Exception as e:
-                    error_msg = f"Error syncing contact {contact_id}: {str(e)}"
-                    errors.append(error_msg)
-                    _logger.error(error_msg)
-                    continue
+            while True:
+                batch = list(islice(api_contacts, CONTACT_SYNC_BATCH_SIZE))
+                if not batch:
+                    break
+                created_count, batch_errors = self._sync_contact_batch(batch, config, synced_at)
+                synced_count += created_count
+                errors.extend(batch_errors)
             
             if errors:
                 return {
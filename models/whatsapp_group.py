@@ -1,8 +1,17 @@
 from odoo import models, fields, api, SUPERUSER_ID
 from odoo.exceptions import ValidationError
 from datetime import datetime, timedelta
+import hashlib
 import logging
-from ..constants import PROVIDERS
+import time
+from ..constants import (
+    PROVIDERS, INVITE_PAGE_CACHE_SIZE, INVITE_PAGE_CACHE_TTL,
+    INVITE_PAGE_HTML_CACHE_SIZE, INVITE_PAGE_HTML_CACHE_TTL, WHATSAPP_USER_SUFFIX,
+    INVITE_FETCH_MIN_INTERVAL, INVITE_FETCH_BREAKER_FAIL_MAX, INVITE_FETCH_BREAKER_RESET,
+    RETRY_STATUS_CODES, INVITE_FETCH_CRON_BUDGET, WEBHOOK_ID_CACHE_SIZE, WEBHOOK_ID_CACHE_TTL
+)
+from ..exceptions import WhatsAppAPIError
+from ..utils import TTLCache, CircuitBreaker, strip_user_suffix
 
 _logger = logging.getLogger(__name__)
 
@@ -45,11 +54,31 @@ class WhatsAppGroup(models.Model):
     # Invite link fields
     invite_code = fields.Char('Invite Code', help='WhatsApp group invite code')
     invite_fetched_at = fields.Datetime('Invite Fetched At', help='When the invite code was last fetched')
+    invite_link = fields.Char('Invite Link', compute='_compute_invite_link')
+    invite_fetch_pending = fields.Boolean('Invite Fetch Pending', copy=False,
+                                          help='An invite code fetch has been queued for the background worker')
     
     _sql_constraints = [
         ('group_id_unique', 'unique(group_id)', 'Group ID must be unique when specified!'),
     ]
     
+    # Invite page values keyed by (dbname, group id, uid, write_date), shared by the worker's
+    # threads; the write_date in the key makes changes made by other workers miss the cache
+    _invite_page_cache = TTLCache(maxsize=INVITE_PAGE_CACHE_SIZE, ttl=INVITE_PAGE_CACHE_TTL)
+    # Rendered invite page HTML keyed by (dbname, group id, uid, write_date, etag)
+    _invite_page_html_cache = TTLCache(maxsize=INVITE_PAGE_HTML_CACHE_SIZE, ttl=INVITE_PAGE_HTML_CACHE_TTL)
+    # Record id per (dbname, WHAPI group_id), used by the webhook preload
+    _webhook_id_cache = TTLCache(maxsize=WEBHOOK_ID_CACHE_SIZE, ttl=WEBHOOK_ID_CACHE_TTL)
+    # At most one queued invite fetch per group every INVITE_FETCH_MIN_INTERVAL seconds
+    _invite_fetch_throttle = TTLCache(maxsize=INVITE_PAGE_CACHE_SIZE, ttl=INVITE_FETCH_MIN_INTERVAL)
+    # Stops hammering WHAPI from the invite fetch cron while it keeps failing
+    _invite_fetch_breaker = CircuitBreaker(fail_max=INVITE_FETCH_BREAKER_FAIL_MAX,
+                                           reset_timeout=INVITE_FETCH_BREAKER_RESET)
+    _INVITE_PAGE_FIELDS = [
+        'name', 'description', 'group_id', 'provider', 'participant_count', 'message_count',
+        'latest_messages_count', 'invite_link', 'invite_fetch_pending', 'write_date',
+    ]
+    
     @api.model
     def search(self, args, offset=0, limit=None, order=None, count=False):
         """Override search to filter by user's accessible configurations"""
@@ -59,14 +88,10 @@ class WhatsAppGroup(models.Model):
 
         # Only apply filtering for non-admin users
         if not self.env.user.has_group('whatsapp_integration.group_whatsapp_admin'):
+            # Cached accessible configuration ids; matches nothing when there are none
             config_ids = self.env['whatsapp.configuration'].get_user_accessible_config_ids()
-            if config_ids:
-                # Add configuration filter to the domain
-                config_domain = [('configuration_id', 'in', config_ids)]
-                args = args + config_domain if args else config_domain
-            else:
-                # User has no accessible configurations, return empty set
-                args = [('id', '=', False)]
+            config_domain = [('configuration_id', 'in', config_ids)]
+            args = args + config_domain if args else config_domain
         
         return super().search(args, offset=offset, limit=limit, order=order, count=count)
     
@@ -125,10 +150,18 @@ class WhatsAppGroup(models.Model):
                 # This is a soft warning - the group creation might be in progress
                 _logger.warning(f"Group '{record.name}' was created without a group_id. API creation might have failed.")
     
+    @api.depends('invite_code')
+    def _compute_invite_link(self):
+        for group in self:
+            group.invite_link = f"https://chat.whatsapp.com/{group.invite_code}" if group.invite_code else False
+    
     @api.depends('participant_ids')
     def _compute_participant_count(self):
+        # Count saved groups in SQL instead of loading every participant; new records
+        # (onchange) only exist in the cache
+        counts = self._get_participant_counts(self.filtered('id').ids)
         for group in self:
-            group.participant_count = len(group.participant_ids)
+            group.participant_count = counts.get(group.id, 0) if group.id else len(group.participant_ids)
     
     @api.depends('message_ids')
     def _compute_message_count(self):
@@ -354,7 +387,7 @@ class WhatsAppGroup(models.Model):
                         
                         # Try to extract from contact_id first
                         if contact.contact_id:
-                            cleaned_contact_id = contact.contact_id.replace('@s.whatsapp.net', '').replace('@c.us', '').strip()
+                            cleaned_contact_id = strip_user_suffix(contact.contact_id).replace('@c.us', '').strip()
                             if cleaned_contact_id and cleaned_contact_id.isdigit():
                                 phone_number = cleaned_contact_id
                                 _logger.info(f"✓ Added participant from contact_id: {phone_number}")
@@ -470,7 +503,7 @@ class WhatsAppGroup(models.Model):
                                 contact_vals = {
                                     'contact_id': participant_id,
                                     'name': participant.get('name', ''),
-                                    'phone': participant_id.replace('@s.whatsapp.net', '').replace('@c.us', ''),
+                                    'phone': strip_user_suffix(participant_id).replace('@c.us', ''),
                                     'provider': 'whapi',
                                     'is_chat_contact': True,
                                     'isWAContact': True,
@@ -499,7 +532,102 @@ class WhatsAppGroup(models.Model):
     def write(self, vals):
         """Override write to update timestamp"""
         vals['updated_at'] = fields.Datetime.now()
+        # The invite page caches are keyed on write_date, so this write makes them miss
+        if 'group_id' in vals or 'configuration_id' in vals:
+            self._invalidate_webhook_id_cache()
         return super().write(vals)
+
+    def unlink(self):
+        self._invalidate_webhook_id_cache()
+        return super().unlink()
+
+    def _invalidate_webhook_id_cache(self):
+        """Drop cached WHAPI id -> record id entries of these groups"""
+        dbname = self.env.cr.dbname
+        keys = set(self.mapped('group_id'))
+        self._webhook_id_cache.discard_where(lambda key: key[0] == dbname and key[1] in keys)
+
+    def _invalidate_invite_page_cache(self):
+        """Drop cached invite page values of these groups for every user
+
+        Only needed for changes that leave write_date as it is, like participants
+        added straight to the relation table.
+        """
+        if not self.ids:
+            return
+        dbname = self.env.cr.dbname
+        group_ids = set(self.ids)
+        predicate = lambda key: key[0] == dbname and key[1] in group_ids
+        self._invite_page_cache.discard_where(predicate)
+        self._invite_page_html_cache.discard_where(predicate)
+
+    @api.model
+    def _get_participant_counts(self, group_ids):
+        """Map group ids to their number of participants with one grouped query"""
+        if not group_ids:
+            return {}
+        self.flush(['participant_ids'])
+        self.env.cr.execute("""
+            SELECT group_id, COUNT(contact_id) FROM whatsapp_group_contact_rel
+            WHERE group_id = ANY(%s)
+            GROUP BY group_id
+        """, (list(group_ids),))
+        return dict(self.env.cr.fetchall())
+
+    @api.model
+    def _get_participant_ids_by_group(self, group_ids):
+        """Map each group id to its participant contact ids with one query on the relation table"""
+        participant_ids = {group_id: [] for group_id in group_ids}
+        if not group_ids:
+            return participant_ids
+        self.flush(['participant_ids'])
+        self.env.cr.execute("""
+            SELECT group_id, contact_id FROM whatsapp_group_contact_rel
+            WHERE group_id = ANY(%s)
+            ORDER BY group_id, contact_id
+        """, (list(group_ids),))
+        for group_id, contact_id in self.env.cr.fetchall():
+            participant_ids[group_id].append(contact_id)
+        return participant_ids
+
+    @api.model
+    def _read_invite_page_values(self, group_id):
+        """Plain values rendered by the invite page, read in a single query
+
+        Returns None when the group does not exist or is not visible to the user.
+        The result is safe to keep in the in-process cache.
+        """
+        rows = self.search_read([('id', '=', group_id)], self._INVITE_PAGE_FIELDS, limit=1)
+        if not rows:
+            return None
+        values = rows[0]
+        values['etag'] = self._get_invite_page_etag(values)
+        return values
+
+    @api.model
+    def _has_invite_page_access(self, group_id):
+        """Whether the current user may read the group, checked on every call"""
+        return self._get_invite_page_stamp(group_id) is not None
+
+    @api.model
+    def _get_invite_page_stamp(self, group_id):
+        """write_date of the group, or None when the current user may not read it
+
+        Runs before any cached invite page is served, so revoked access takes effect at
+        once. The write_date also keys the caches, so every worker sees changes.
+        """
+        if not self.check_access_rights('read', raise_exception=False):
+            return None
+        # search applies record rules and the configuration filter in one query
+        rows = self.search_read([('id', '=', group_id)], ['write_date'], limit=1)
+        return rows[0]['write_date'] if rows else None
+
+    @api.model
+    def _get_invite_page_etag(self, values):
+        """Strong validator for the invite page, changes whenever the group or its link changes"""
+        write_ts = values['write_date'].timestamp() if values.get('write_date') else 0
+        payload = f'{values["id"]}:{write_ts}:{values.get("invite_link") or ""}'
+        return hashlib.blake2b(payload.encode(), digest_size=16).hexdigest()
     
     @api.model
     def create_from_api_response(self, api_response, provider='whapi'):
@@ -878,13 +1006,13 @@ class WhatsAppGroup(models.Model):
                             # Convert phone number to WhatsApp contact ID format if needed
                             if '@' not in contact_id and contact_id.isdigit():
                                 # This is a phone number, convert to WhatsApp format
-                                whatsapp_contact_id = f"{contact_id}@s.whatsapp.net"
+                                whatsapp_contact_id = f"{contact_id}{WHATSAPP_USER_SUFFIX}"
                                 phone_number = contact_id
                             else:
                                 # Already in WhatsApp format or other format
                                 whatsapp_contact_id = contact_id
-                                if '@s.whatsapp.net' in contact_id:
-                                    phone_number = contact_id.replace('@s.whatsapp.net', '')
+                                if contact_id.endswith(WHATSAPP_USER_SUFFIX):
+                                    phone_number = strip_user_suffix(contact_id)
                                 elif '@c.us' in contact_id:
                                     phone_number = contact_id.replace('@c.us', '')
                                 else:
@@ -1019,6 +1147,79 @@ class WhatsAppGroup(models.Model):
                 'message': error_message
             }
 
+    def _queue_invite_fetch(self):
+        """Queue invite code fetching for the background cron instead of calling WHAPI inline"""
+        dbname = self.env.cr.dbname
+        groups = self.filtered(
+            lambda g: g.provider == 'whapi' and g.group_id and not g.invite_fetch_pending
+            and not self._invite_fetch_throttle.get((dbname, g.id))
+        )
+        if not groups:
+            return False
+        
+        for group in groups:
+            self._invite_fetch_throttle.set((dbname, group.id), True)
+        groups.sudo().with_context(skip_config_filter=True).write({'invite_fetch_pending': True})
+        
+        self._trigger_invite_fetch_cron()
+        return True
+
+    @api.model
+    def _trigger_invite_fetch_cron(self):
+        cron = self.env.ref('whatsapp_integration.ir_cron_fetch_pending_invite_codes', raise_if_not_found=False)
+        if cron:
+            cron.sudo()._trigger()
+
+    @api.model
+    def _cron_fetch_pending_invite_codes(self, limit=50):
+        """Cron job fetching invite codes for groups queued by _queue_invite_fetch"""
+        groups = self.with_context(skip_config_filter=True).search([
+            ('invite_fetch_pending', '=', True),
+        ], limit=limit)
+        if not groups:
+            return
+        
+        api_service = self.env['whapi.service']
+        breaker = self._invite_fetch_breaker
+        deadline = time.monotonic() + INVITE_FETCH_CRON_BUDGET
+        fetched_count = 0
+        
+        for index, group in enumerate(groups):
+            if time.monotonic() > deadline:
+                # Free the cron worker for other jobs and pick up the rest right after
+                _logger.info("Invite fetch time budget spent, re-queuing %s groups", len(groups) - index)
+                self._trigger_invite_fetch_cron()
+                break
+            # Checked right before the call, an allowed trial call always reports its outcome
+            if not breaker.allow():
+                # Leave the remaining groups pending for the next run
+                _logger.warning("WHAPI circuit breaker open, postponing %s queued invite fetches",
+                                len(groups) - index)
+                break
+            vals = {'invite_fetch_pending': False}
+            try:
+                result = api_service._make_request("GET", f"/groups/{group.group_id}/invite")
+                breaker.record_success()
+                invite_code = result.get('invite_code') if isinstance(result, dict) else None
+                if invite_code:
+                    vals.update({
+                        'invite_code': invite_code,
+                        'invite_fetched_at': fields.Datetime.now(),
+                    })
+                    fetched_count += 1
+            except Exception as e:
+                # Only outages count against the breaker, not a rejection of this one group
+                status_code = e.status_code if isinstance(e, WhatsAppAPIError) else None
+                if status_code is None or status_code in RETRY_STATUS_CODES:
+                    breaker.record_failure()
+                else:
+                    # WHAPI answered, so it is reachable
+                    breaker.record_success()
+                _logger.error("Failed to fetch queued invite code for %s: %s", group.name, e)
+            group.write(vals)
+        
+        _logger.info("Fetched %s queued invite codes out of %s pending groups", fetched_count, len(groups))
+
     @api.model 
     def _auto_fetch_invite_codes(self):
         """Automatically fetch invite codes for all WHAPI groups that don't have them"""
@@ -1058,7 +1259,6 @@ class WhatsAppGroup(models.Model):
                         error_count += 1
                     
                     # Small delay to avoid rate limiting
-                    import time
                     time.sleep(0.5)
                     
                 except Exception as invite_error:
@@ -1122,7 +1322,6 @@ class WhatsAppGroup(models.Model):
                     error_count += 1
                 
                 # Small delay to avoid rate limiting
-                import time
                 time.sleep(0.3)
             
             return {
@@ -1235,7 +1434,6 @@ class WhatsAppGroup(models.Model):
                     error_count += 1
                     
                 # Small delay to avoid rate limiting
-                import time
                 time.sleep(0.2)
                 
             except Exception as e:
@@ -1352,7 +1550,6 @@ class WhatsAppGroup(models.Model):
                     error_count += 1
                 
                 # Small delay to avoid rate limiting
-                import time
                 time.sleep(0.3)
             
             return {
@@ -1469,12 +1666,12 @@ class WhatsAppGroup(models.Model):
                     
                     # Convert to WhatsApp format
                     if '@' not in contact_id and contact_id.isdigit():
-                        whatsapp_contact_id = f"{contact_id}@s.whatsapp.net"
+                        whatsapp_contact_id = f"{contact_id}{WHATSAPP_USER_SUFFIX}"
                         phone_number = contact_id
                     else:
                         whatsapp_contact_id = contact_id
-                        if '@s.whatsapp.net' in contact_id:
-                            phone_number = contact_id.replace('@s.whatsapp.net', '')
+                        if contact_id.endswith(WHATSAPP_USER_SUFFIX):
+                            phone_number = strip_user_suffix(contact_id)
                         elif '@c.us' in contact_id:
                             phone_number = contact_id.replace('@c.us', '')
                         else:
@@ -1534,7 +1731,6 @@ class WhatsAppGroup(models.Model):
                 total_members_synced += len(participant_contacts)
                 
                 # Small delay to avoid rate limiting
-                import time
                 time.sleep(0.3)
                 
             except Exception as e:
@@ -1,8 +1,8 @@
 from odoo import models, fields, api, SUPERUSER_ID
 import logging
-import json
 from ..constants import MESSAGE_TYPES, MESSAGE_STATUS, PROVIDERS, WHATSAPP_GROUP_SUFFIX
 from ..services.transformers.message_transformer import MessageTransformer
+from ..utils import json_loads, strip_user_suffix
 
 _logger = logging.getLogger(__name__)
 
@@ -78,22 +78,30 @@ class WhatsAppMessage(models.Model):
     @api.model
     def search(self, args, offset=0, limit=None, order=None, count=False):
         """Override search to filter by user's accessible configurations"""
+        config_domain = self._get_config_filter_domain()
+        if config_domain:
+            args = args + config_domain if args else config_domain
+        
+        return super().search(args, offset=offset, limit=limit, order=order, count=count)
+    
+    @api.model
+    def _get_config_filter_domain(self):
+        """Domain restricting messages to the user's accessible configurations
+        
+        Empty for the superuser, WhatsApp admins and when skip_config_filter is set.
+        Also used by callers aggregating with read_group, which does not go through search.
+        """
         # Skip filtering for superuser or when explicitly requested
         if self.env.user.id == SUPERUSER_ID or self.env.context.get('skip_config_filter'):
-            return super().search(args, offset=offset, limit=limit, order=order, count=count)
+            return []
 
         # Only apply filtering for non-admin users
-        if not self.env.user.has_group('whatsapp_integration.group_whatsapp_admin'):
-            config_ids = self.env['whatsapp.configuration'].get_user_accessible_config_ids()
-            if config_ids:
-                # Add configuration filter to the domain
-                config_domain = [('configuration_id', 'in', config_ids)]
-                args = args + config_domain if args else config_domain
-            else:
-                # User has no accessible configurations, return empty set
-                args = [('id', '=', False)]
-        
-        return super().search(args, offset=offset, limit=limit, order=order, count=count)
+        if self.env.user.has_group('whatsapp_integration.group_whatsapp_admin'):
+            return []
+
+        # Cached accessible configuration ids; matches nothing when there are none
+        config_ids = self.env['whatsapp.configuration'].get_user_accessible_config_ids()
+        return [('configuration_id', 'in', config_ids)]
     
     @api.depends('chat_id', 'from_me', 'contact_id', 'metadata')
     def _compute_sender_link(self):
@@ -107,7 +115,7 @@ class WhatsAppMessage(models.Model):
             sender_phone = None
             if record.metadata:
                 try:
-                    meta = json.loads(record.metadata) if isinstance(record.metadata, str) else record.metadata
+                    meta = json_loads(record.metadata) if isinstance(record.metadata, str) else record.metadata
                     if isinstance(meta, dict):
                         sender_phone = meta.get('from', '')
                 except Exception:
@@ -115,7 +123,7 @@ class WhatsAppMessage(models.Model):
             
             # Fallback to chat_id if it's individual chat
             if not sender_phone and not record.chat_id.endswith(WHATSAPP_GROUP_SUFFIX):
-                sender_phone = record.chat_id.replace('@s.whatsapp.net', '')
+                sender_phone = strip_user_suffix(record.chat_id)
             
             if not sender_phone:
                 record.sender_link = '<span class="text-muted">Unknown</span>'
@@ -131,7 +139,7 @@ class WhatsAppMessage(models.Model):
                 record.sender_link = f'<a href="#" data-oe-model="whatsapp.contact" data-oe-id="{contact.id}" class="o_form_uri">{contact.name or contact.phone}</a>'
             else:
                 # Create WhatsApp web link for unknown contact
-                clean_phone = sender_phone.replace('@s.whatsapp.net', '')
+                clean_phone = strip_user_suffix(sender_phone)
                 if clean_phone.isdigit():
                     record.sender_link = f'<a href="https://wa.me/{clean_phone}" target="_blank" title="Open in WhatsApp Web">{clean_phone}</a>'
                 else:
@@ -232,7 +240,7 @@ class WhatsAppMessage(models.Model):
                 vals['group_id'] = group.id
         else:
             # Individual message - find or create contact
-            phone = chat_id.replace('@s.whatsapp.net', '')
+            phone = strip_user_suffix(chat_id)
             contact = self.env['whatsapp.contact'].search([
                 '|', ('contact_id', '=', chat_id), ('phone', '=', phone)
             ], limit=1)
@@ -246,10 +254,10 @@ class WhatsAppMessage(models.Model):
                 sender_contact = self.env['whatsapp.contact'].search([
                     '|', ('contact_id', '=', sender_phone), ('phone', '=', sender_phone)
                 ], limit=1)
-                if not sender_contact and sender_phone.replace('@s.whatsapp.net', '').isdigit():
+                if not sender_contact and strip_user_suffix(sender_phone).isdigit():
                     # Create new contact for unknown sender
                     try:
-                        clean_phone = sender_phone.replace('@s.whatsapp.net', '')
+                        clean_phone = strip_user_suffix(sender_phone)
                         sender_contact = self.env['whatsapp.contact'].create({
                             'contact_id': sender_phone,
                             'phone': clean_phone,
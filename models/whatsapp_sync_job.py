@@ -0,0 +1,124 @@
+from odoo import models, fields, api
+from datetime import timedelta
+import logging
+from ..constants import SYNC_JOB_BATCH_SIZE, SYNC_JOB_RETENTION_DAYS, SYNC_JOB_CRON
+from ..utils import json_dumps, json_loads
+
+_logger = logging.getLogger(__name__)
+
+# Job kind -> (model, method) run by the job, with the job parameters as keyword arguments
+_SYNC_METHODS = {
+    'groups': ('whatsapp.service', 'sync_all_groups'),
+    'contacts': ('whatsapp.contact', 'sync_all_contacts_from_api'),
+    'messages': ('whatsapp.message', 'sync_all_messages_from_api'),
+}
+
+class WhatsAppSyncJob(models.Model):
+    _name = 'whatsapp.sync.job'
+    _description = 'WhatsApp Sync Job'
+    _order = 'id'
+
+    kind = fields.Selection([
+        ('groups', 'Groups'),
+        ('contacts', 'Contacts'),
+        ('messages', 'Messages'),
+    ], string='Kind', required=True)
+    params = fields.Text('Parameters', default='{}', help='Keyword arguments of the sync method, as JSON')
+    user_id = fields.Many2one('res.users', string='Requested By', required=True, ondelete='cascade',
+                              help='The sync runs as this user, with their WhatsApp configuration')
+    state = fields.Selection([
+        ('pending', 'Pending'),
+        ('done', 'Done'),
+        ('error', 'Error'),
+    ], string='State', default='pending', required=True, index=True)
+    result = fields.Text('Result')
+    error_message = fields.Text('Error Message')
+    processed_at = fields.Datetime('Processed At')
+
+    @api.model
+    def enqueue(self, kind, **params):
+        """Queue a sync for the current user and wake up the processing cron"""
+        job = self.sudo().create({
+            'kind': kind,
+            'params': json_dumps(params),
+            'user_id': self.env.uid,
+        })
+        cron = self.env.ref(SYNC_JOB_CRON, raise_if_not_found=False)
+        if cron:
+            cron.sudo()._trigger()
+        return job
+
+    def to_dict(self):
+        """Public status of the job, as returned by the sync endpoints"""
+        self.ensure_one()
+        return {
+            'job_id': self.id,
+            'kind': self.kind,
+            'state': self.state,
+            'result': json_loads(self.result) if self.result else None,
+            'error': self.error_message or None,
+        }
+
+    @api.model
+    def _cron_process_jobs(self, limit=SYNC_JOB_BATCH_SIZE):
+        """Cron job running queued syncs in request order"""
+        # Rows locked by a concurrent run are skipped instead of synced twice
+        self.env.cr.execute("""
+            SELECT id FROM whatsapp_sync_job
+            WHERE state = 'pending'
+            ORDER BY id
+            LIMIT %s
+            FOR UPDATE SKIP LOCKED
+        """, (limit,))
+        job_ids = [row[0] for row in self.env.cr.fetchall()]
+        if not job_ids:
+            return
+
+        for job in self.browse(job_ids):
+            job._process_job()
+
+        _logger.info("Processed %s queued sync jobs", len(job_ids))
+
+        # More jobs may be waiting, run again right away instead of on the next interval
+        if len(job_ids) == limit:
+            self.env.ref(SYNC_JOB_CRON).sudo()._trigger()
+
+    def _process_job(self):
+        """Run one queued sync as its requesting user, in its own transaction
+
+        The sync methods commit their progress part-way, so they cannot run inside a
+        savepoint of the cron transaction. They get a separate cursor instead, committed
+        when the sync succeeds and rolled back when it fails, while the cron transaction
+        keeps the job row locked and records the outcome.
+        """
+        self.ensure_one()
+        model_name, method_name = _SYNC_METHODS[self.kind]
+        params = json_loads(self.params or '{}')
+        try:
+            with self.pool.cursor() as cr:
+                env = api.Environment(cr, self.user_id.id, self.env.context)
+                result = getattr(env[model_name], method_name)(**params)
+                if isinstance(result, dict) and (result.get('error') or result.get('success') is False):
+                    raise ValueError(result.get('error') or result.get('message') or 'Sync failed')
+        except Exception as e:
+            _logger.exception("Queued %s sync %s failed", self.kind, self.id)
+            self.write({
+                'state': 'error',
+                'error_message': str(e),
+                'processed_at': fields.Datetime.now(),
+            })
+            return False
+
+        self.write({
+            'state': 'done',
+            'result': json_dumps(result, default=str),
+            'error_message': False,
+            'processed_at': fields.Datetime.now(),
+        })
+        return True
+
+    @api.autovacuum
+    def _gc_processed_jobs(self):
+        """Drop finished jobs once they are older than the retention period"""
+        limit_date = fields.Datetime.now() - timedelta(days=SYNC_JOB_RETENTION_DAYS)
+        self.search([('state', '!=', 'pending'), ('processed_at', '<', limit_date)]).unlink()
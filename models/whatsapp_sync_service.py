@@ -41,10 +41,11 @@ class WhatsAppSyncService(models.Model):
         try:
             _logger.info("Starting automated WhatsApp data sync")
             
-            # Get all configurations and sync for each one
-            configs = self.env['whatsapp.configuration'].search([('active', '=', True)])
+            # The sync methods work on the configuration of the current user, so they run once:
+            # looping over every active configuration repeated the same remote sync per config
+            config = self.env['whatsapp.configuration'].get_user_configuration()
             
-            if not configs:
+            if not config:
                 _logger.warning("No active WhatsApp configurations found for sync")
                 return
             
@@ -54,61 +55,53 @@ class WhatsAppSyncService(models.Model):
             total_group_members = 0
             errors = []
             
-            for config in configs:
-                try:
-                    _logger.info(f"Syncing data for configuration: {config.name}")
-                    
-                    # For now, sync without specific context to avoid compatibility issues
-                    sync_env = self.env
-                    
-                    # Sync contacts
-                    try:
-                        contact_result = sync_env['whatsapp.contact'].sync_all_contacts_from_api()
-                        if contact_result.get('success'):
-                            total_contacts += contact_result.get('count', 0)
-                            _logger.info(f"Synced {contact_result.get('count', 0)} contacts for config {config.name}")
-                        else:
-                            errors.append(f"Config {config.name} - Contacts: {contact_result.get('message', 'Unknown error')}")
-                    except Exception as e:
-                        _logger.error(f"Error syncing contacts for config {config.name}: {str(e)}")
-                        errors.append(f"Config {config.name} - Contacts error: {str(e)}")
-                    
-                    # Sync groups
-                    try:
-                        groups_synced = sync_env['whatsapp.group'].sync_all_groups_from_api()
-                        total_groups += groups_synced
-                        _logger.info(f"Synced {groups_synced} groups for config {config.name}")
-                    except Exception as e:
-                        _logger.error(f"Error syncing groups for config {config.name}: {str(e)}")
-                        errors.append(f"Config {config.name} - Groups error: {str(e)}")
-                    
-                    # Sync messages
-                    try:
-                        message_result = sync_env['whatsapp.message'].sync_all_messages_from_api(count=50)
-                        if message_result.get('success'):
-                            total_messages += message_result.get('count', 0)
-                            _logger.info(f"Synced {message_result.get('count', 0)} messages for config {config.name}")
-                        else:
-                            errors.append(f"Config {config.name} - Messages: {message_result.get('message', 'Unknown error')}")
-                    except Exception as e:
-                        _logger.error(f"Error syncing messages for config {config.name}: {str(e)}")
-                        errors.append(f"Config {config.name} - Messages error: {str(e)}")
-                    
-                    # Sync group members
-                    try:
-                        member_result = sync_env['whatsapp.group'].sync_all_group_members_from_api()
-                        if member_result.get('success'):
-                            total_group_members += member_result.get('count', 0)
-                            _logger.info(f"Synced {member_result.get('count', 0)} group members for config {config.name}")
-                        else:
-                            errors.append(f"Config {config.name} - Group members: {member_result.get('message', 'Unknown error')}")
-                    except Exception as e:
-                        _logger.error(f"Error syncing group members for config {config.name}: {str(e)}")
-                        errors.append(f"Config {config.name} - Group members error: {str(e)}")
-                        
-                except Exception as e:
-                    _logger.error(f"Error processing configuration {config.name}: {str(e)}")
-                    errors.append(f"Config {config.name} - General error: {str(e)}")
+            _logger.info(f"Syncing data for configuration: {config.name}")
+            sync_env = self.env
+            
+            # Sync contacts
+            try:
+                contact_result = sync_env['whatsapp.contact'].sync_all_contacts_from_api()
+                if contact_result.get('success'):
+                    total_contacts += contact_result.get('count', 0)
+                    _logger.info(f"Synced {contact_result.get('count', 0)} contacts for config {config.name}")
+                else:
+                    errors.append(f"Config {config.name} - Contacts: {contact_result.get('message', 'Unknown error')}")
+            except Exception as e:
+                _logger.error(f"Error syncing contacts for config {config.name}: {str(e)}")
+                errors.append(f"Config {config.name} - Contacts error: {str(e)}")
+            
+            # Sync groups
+            try:
+                groups_synced = sync_env['whatsapp.group'].sync_all_groups_from_api()
+                total_groups += groups_synced
+                _logger.info(f"Synced {groups_synced} groups for config {config.name}")
+            except Exception as e:
+                _logger.error(f"Error syncing groups for config {config.name}: {str(e)}")
+                errors.append(f"Config {config.name} - Groups error: {str(e)}")
+            
+            # Sync messages
+            try:
+                message_result = sync_env['whatsapp.message'].sync_all_messages_from_api(count=50)
+                if message_result.get('success'):
+                    total_messages += message_result.get('count', 0)
+                    _logger.info(f"Synced {message_result.get('count', 0)} messages for config {config.name}")
+                else:
+                    errors.append(f"Config {config.name} - Messages: {message_result.get('message', 'Unknown error')}")
+            except Exception as e:
+                _logger.error(f"Error syncing messages for config {config.name}: {str(e)}")
+                errors.append(f"Config {config.name} - Messages error: {str(e)}")
+            
+            # Sync group members
+            try:
+                member_result = sync_env['whatsapp.group'].sync_all_group_members_from_api()
+                if member_result.get('success'):
+                    total_group_members += member_result.get('count', 0)
+                    _logger.info(f"Synced {member_result.get('count', 0)} group members for config {config.name}")
+                else:
+                    errors.append(f"Config {config.name} - Group members: {member_result.get('message', 'Unknown error')}")
+            except Exception as e:
+                _logger.error(f"Error syncing group members for config {config.name}: {str(e)}")
+                errors.append(f"Config {config.name} - Group members error: {str(e)}")
             
             # Update sync service record
             sync_service = self.search([], limit=1)
@@ -0,0 +1,154 @@
+from odoo import models, fields, api
+from datetime import timedelta
+import logging
+import zlib
+from ..constants import (
+    WEBHOOK_QUEUE_BATCH_SIZE, WEBHOOK_QUEUE_MAX_ATTEMPTS, WEBHOOK_QUEUE_RETENTION_DAYS,
+    WEBHOOK_QUEUE_LANE_CRONS
+)
+from ..exceptions import WhatsAppConcurrentInsertError
+from ..utils import json_dumps, json_loads
+
+_logger = logging.getLogger(__name__)
+
+class WhatsAppWebhookQueue(models.Model):
+    _name = 'whatsapp.webhook.queue'
+    _description = 'WhatsApp Webhook Queue'
+    _order = 'id'
+
+    kind = fields.Selection([
+        ('messages', 'Messages'),
+        ('statuses', 'Statuses'),
+    ], string='Kind', required=True)
+    payload = fields.Text('Payload', required=True, help='Raw webhook JSON body')
+    state = fields.Selection([
+        ('pending', 'Pending'),
+        ('done', 'Done'),
+        ('error', 'Error'),
+    ], string='State', default='pending', required=True, index=True)
+    attempts = fields.Integer('Attempts', default=0)
+    error_message = fields.Text('Error Message')
+    processed_at = fields.Datetime('Processed At')
+    lane = fields.Integer('Lane', default=0, index=True,
+                          help='Processing cron of this payload, derived from its channel')
+
+    @api.model
+    def enqueue(self, kind, data):
+        """Store a raw webhook payload with a single INSERT and wake up the processing cron"""
+        lane = self._get_lane(str(data.get('channel_id') or ''))
+        entry = self.create({
+            'kind': kind,
+            'payload': json_dumps(data),
+            'lane': lane,
+        })
+        self._trigger_queue_cron(lane)
+        return entry
+
+    @api.model
+    def _get_lane(self, channel_id):
+        """Lane of a channel, stable across workers and restarts"""
+        return zlib.crc32(channel_id.encode()) % len(WEBHOOK_QUEUE_LANE_CRONS)
+
+    @api.model
+    def _trigger_queue_cron(self, lane=0):
+        cron = self.env.ref(WEBHOOK_QUEUE_LANE_CRONS[lane], raise_if_not_found=False)
+        if cron:
+            cron.sudo()._trigger()
+
+    @api.model
+    def _cron_process_queue(self, limit=WEBHOOK_QUEUE_BATCH_SIZE, lane=None):
+        """Cron job processing pending webhook payloads in arrival order
+
+        Each lane has its own cron, so separate channels are processed in parallel by
+        the cron workers while the payloads of one channel keep their order. Without
+        a lane every pending payload is taken.
+        """
+        # Rows locked by a concurrent run are skipped instead of processed twice
+        lane_clause = "AND lane = %s" if lane is not None else ""
+        params = (lane, limit) if lane is not None else (limit,)
+        self.env.cr.execute(f"""
+            SELECT id FROM whatsapp_webhook_queue
+            WHERE state = 'pending' {lane_clause}
+            ORDER BY id
+            LIMIT %s
+            FOR UPDATE SKIP LOCKED
+        """, params)
+        entry_ids = [row[0] for row in self.env.cr.fetchall()]
+        if not entry_ids:
+            return
+
+        processed = 0
+        for entry in self.browse(entry_ids):
+            try:
+                entry._process_entry()
+            except WhatsAppConcurrentInsertError as e:
+                # Later payloads of the lane wait for this one, so the channel keeps its order
+                entry._retry_after_race(e)
+                break
+            processed += 1
+
+        _logger.info("Processed %s queued webhook payloads", processed)
+
+        # More work may be waiting, run again right away instead of on the next interval
+        if len(entry_ids) == limit:
+            self._trigger_queue_cron(lane or 0)
+
+    def _process_entry(self):
+        """Process one queued payload, rolling back its changes if it fails
+
+        A WhatsAppConcurrentInsertError is raised again for the caller to retry the payload.
+        """
+        self.ensure_one()
+        processor = self.env['whatsapp.webhook.processor']
+        attempts = self.attempts + 1
+        try:
+            with self.env.cr.savepoint():
+                data = json_loads(self.payload)
+                if self.kind == 'messages':
+                    result = processor._process_messages_payload(data)
+                else:
+                    result = processor._process_statuses_payload(data)
+                if result.get('status') == 'error':
+                    raise ValueError(result.get('message') or 'Webhook processing failed')
+        except WhatsAppConcurrentInsertError:
+            raise
+        except Exception as e:
+            _logger.exception("Failed to process queued webhook %s (attempt %s)", self.id, attempts)
+            self.write({
+                'state': 'pending' if attempts < WEBHOOK_QUEUE_MAX_ATTEMPTS else 'error',
+                'attempts': attempts,
+                'error_message': str(e),
+            })
+            return False
+
+        self.write({
+            'state': 'done',
+            'attempts': attempts,
+            'error_message': False,
+            'processed_at': fields.Datetime.now(),
+        })
+        return True
+
+    def _retry_after_race(self, error):
+        """Leave a payload that raced a concurrent insert pending for the next run
+
+        The next run has a new snapshot that sees the other insert. The retry still
+        counts as an attempt, so a race that keeps happening ends in the error state.
+        """
+        self.ensure_one()
+        attempts = self.attempts + 1
+        state = 'pending' if attempts < WEBHOOK_QUEUE_MAX_ATTEMPTS else 'error'
+        _logger.info("Queued webhook %s raced a concurrent insert (attempt %s): %s", self.id, attempts, error)
+        self.write({
+            'state': state,
+            'attempts': attempts,
+            'error_message': str(error),
+        })
+        if state == 'pending':
+            self._trigger_queue_cron(self.lane)
+
+    @api.autovacuum
+    def _gc_processed_entries(self):
+        """Drop processed payloads once they are older than the retention period"""
+        limit_date = fields.Datetime.now() - timedelta(days=WEBHOOK_QUEUE_RETENTION_DAYS)
+        self.search([('state', '=', 'done'), ('processed_at', '<', limit_date)]).unlink()
@@ -1,2 +1,3 @@
 from . import wassenger_api
 from . import whapi_service
+from . import webhook_processor
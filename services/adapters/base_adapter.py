@@ -6,7 +6,7 @@ from abc import ABC, abstractmethod
 from typing import Dict, List, Optional, Union
 from odoo import models, api, fields
 from ..dto import MessageDTO, MediaMessageDTO, ContactDTO, GroupDTO, GroupParticipantDTO
-from ...constants import MAX_RETRIES, RETRY_BACKOFF_FACTOR, RETRY_STATUS_CODES
+from ..http_client import get_session
 
 
 class IWhatsAppProvider(ABC):
@@ -291,23 +291,9 @@ class BaseWhatsAppAdapter(models.AbstractModel, IWhatsAppProvider):
     
     @api.model
     def get_http_client(self):
-        """Get or create HTTP client with retry logic"""
+        """Get the shared pooled HTTP client with retry logic"""
         if not self._http_client:
-            import requests
-            from requests.adapters import HTTPAdapter
-            from urllib3.util.retry import Retry
-            
-            retry_strategy = Retry(
-                total=MAX_RETRIES,
-                backoff_factor=RETRY_BACKOFF_FACTOR,
-                status_forcelist=RETRY_STATUS_CODES,
-            )
-            adapter = HTTPAdapter(max_retries=retry_strategy)
-            
-            session = requests.Session()
-            session.mount("http://", adapter)
-            session.mount("https://", adapter)
-            self._http_client = session
+            self._http_client = get_session()
         
         return self._http_client
     
@@ -315,7 +301,7 @@ class BaseWhatsAppAdapter(models.AbstractModel, IWhatsAppProvider):
                      response_time: float = None, error: str = None):
         """Log API call for observability"""
         try:
-            self.env['whatsapp.audit.log'].sudo().create({
+            self.env['whatsapp.audit.log']._create_log({
                 'provider': self.provider_name,
                 'method': method,
                 'endpoint': endpoint,
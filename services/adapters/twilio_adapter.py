@@ -12,7 +12,7 @@ from typing import Dict, List, Optional, Union
 from odoo import models, api, fields
 from .base_adapter import BaseWhatsAppAdapter
 from ..dto import MessageDTO, MediaMessageDTO, ContactDTO, GroupDTO, GroupParticipantDTO
-from ...constants import API_TIMEOUT_SHORT, API_TIMEOUT_LONG, MIME_TYPES
+from ...constants import API_TIMEOUT_SHORT, API_TIMEOUT_LONG
 
 _logger = logging.getLogger(__name__)
 
@@ -462,7 +462,7 @@ class TwilioAdapter(BaseWhatsAppAdapter):
             # Download the first media item
             media_url = media_items[0].get('uri', '')
             if media_url:
-                media_response = requests.get(media_url, auth=(self.account_sid, self.auth_token))
+                media_response = self.get_http_client().get(media_url, auth=(self.account_sid, self.auth_token), timeout=API_TIMEOUT_LONG)
                 return {
                     'success': True,
                     'data': media_response.content,
@@ -14,8 +14,9 @@ from .base_adapter import BaseWhatsAppAdapter
 from ..dto import MessageDTO, MediaMessageDTO, ContactDTO, GroupDTO, GroupParticipantDTO
 from ...constants import (
     API_TIMEOUT_SHORT, API_TIMEOUT_LONG, WHATSAPP_USER_SUFFIX,
-    MIME_TYPES, IMAGE_HEADERS, MAX_RETRIES, RETRY_BACKOFF_FACTOR, RETRY_STATUS_CODES
+    MAX_RETRIES, RETRY_BACKOFF_FACTOR, RETRY_STATUS_CODES
 )
+from ...utils import decodes_to_binary, has_image_header, resolve_mime_type, strip_base64_whitespace
 
 _logger = logging.getLogger(__name__)
 
@@ -198,7 +199,7 @@ class WhapiAdapter(BaseWhatsAppAdapter):
             
             # Format recipient
             if '@' not in to:
-                to = f"{to}@s.whatsapp.net"
+                to = f"{to}{WHATSAPP_USER_SUFFIX}"
             
             endpoint = f'/messages/media/{media_dto.media_type}'
             params = {'to': to}
@@ -235,7 +236,11 @@ class WhapiAdapter(BaseWhatsAppAdapter):
     def _fix_double_encoding(self, data: str) -> str:
         """Fix double encoding issue from Odoo binary fields"""
         try:
-            clean_data = data.replace('\n', '').replace('\r', '').replace(' ', '')
+            clean_data = strip_base64_whitespace(data)
+            
+            # Binary content (the common case) is not double encoded, skip the full decode
+            if decodes_to_binary(clean_data):
+                return clean_data
             
             # Try to decode and check if it's double encoded
             try:
@@ -243,16 +248,9 @@ class WhapiAdapter(BaseWhatsAppAdapter):
                 
                 # Check if the first decode result is still base64 by trying to decode it as text
                 try:
-                    potential_base64 = first_decode.decode('utf-8')
-                    
-                    # Check if this looks like base64 by checking for image headers
-                    header_match = False
-                    for header in IMAGE_HEADERS:
-                        if potential_base64.startswith(header):
-                            header_match = True
-                            break
-                    
-                    if header_match:
+                    # Check for image headers on the raw bytes; only a match is decoded as text
+                    if has_image_header(first_decode):
+                        potential_base64 = first_decode.decode('ascii')
                         # Validate this is actually valid base64 by decoding it
                         try:
                             base64.b64decode(potential_base64, validate=True)
@@ -274,15 +272,7 @@ class WhapiAdapter(BaseWhatsAppAdapter):
     
     def _get_mime_type(self, message_type: str, filename: str) -> str:
         """Get MIME type based on message type and filename"""
-        if message_type in MIME_TYPES:
-            type_map = MIME_TYPES[message_type]
-            if filename:
-                for ext, mime in type_map.items():
-                    if ext != 'default' and filename.lower().endswith(ext):
-                        return mime
-            return type_map['default']
-        
-        return 'application/octet-stream'
+        return resolve_mime_type(message_type, filename)
     
     def get_message_status(self, message_id: str) -> Dict:
         """Get message status from WHAPI"""
@@ -0,0 +1,52 @@
+"""
+WhatsApp Integration HTTP Client
+Shared pooled requests session used by every provider service
+"""
+import atexit
+import logging
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+from ..constants import (
+    MAX_RETRIES, RETRY_BACKOFF_FACTOR, RETRY_STATUS_CODES,
+    HTTP_POOL_CONNECTIONS, HTTP_POOL_MAXSIZE
+)
+
+_logger = logging.getLogger(__name__)
+
+
+def _build_session() -> requests.Session:
+    """Create a keep-alive session with connection pooling and retries"""
+    # urllib3 only retries idempotent methods by default, so message sends
+    # (POST) are never replayed on a 5xx
+    retry_strategy = Retry(
+        total=MAX_RETRIES,
+        backoff_factor=RETRY_BACKOFF_FACTOR,
+        status_forcelist=RETRY_STATUS_CODES,
+    )
+    adapter = HTTPAdapter(
+        max_retries=retry_strategy,
+        pool_connections=HTTP_POOL_CONNECTIONS,
+        pool_maxsize=HTTP_POOL_MAXSIZE,
+    )
+
+    session = requests.Session()
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
+    return session
+
+
+SESSION = _build_session()
+
+
+def get_session() -> requests.Session:
+    """Return the process-wide pooled session"""
+    return SESSION
+
+
+@atexit.register
+def _close_session():
+    try:
+        SESSION.close()
+    except Exception as e:
+        _logger.debug(f"Failed to close HTTP session: {e}")
@@ -5,6 +5,7 @@ Handles transformation between DTOs and provider-specific formats
 import time
 from typing import Dict, Any, List
 from ..dto import MessageDTO, MediaMessageDTO
+from ...utils import resolve_mime_type
 import logging
 
 _logger = logging.getLogger(__name__)
@@ -215,30 +216,7 @@ class MessageTransformer:
     @staticmethod
     def _get_mime_type(message_type: str, filename: str) -> str:
         """Get MIME type based on message type and filename"""
-        mime_types = {
-            'image': {
-                '.png': 'image/png',
-                '.gif': 'image/gif',
-                '.webp': 'image/webp',
-                'default': 'image/jpeg'
-            },
-            'video': {'default': 'video/mp4'},
-            'audio': {'default': 'audio/mpeg'},
-            'document': {
-                '.pdf': 'application/pdf',
-                'default': 'application/octet-stream'
-            }
-        }
-        
-        if message_type in mime_types:
-            type_map = mime_types[message_type]
-            if filename:
-                for ext, mime in type_map.items():
-                    if ext != 'default' and filename.lower().endswith(ext):
-                        return mime
-            return type_map['default']
-        
-        return 'application/octet-stream'
+        return resolve_mime_type(message_type, filename)
     
     @staticmethod
     def _get_message_type_from_mime(mime_type: str) -> str:
@@ -7,6 +7,7 @@ from typing import Dict, List, Optional
 from odoo import api, models, fields
 from odoo.exceptions import AccessError, ValidationError
 from ..constants import API_TIMEOUT_SHORT, API_TIMEOUT_LONG
+from .http_client import get_session
 
 _logger = logging.getLogger(__name__)
 
@@ -58,18 +59,20 @@ class WassengerAPI(models.AbstractModel):
         if not files:
             headers["Content-Type"] = "application/json"
 
+        session = get_session()
+
         try:
             if method.upper() == "GET":
-                response = requests.get(url, headers=headers, timeout=API_TIMEOUT_SHORT)
+                response = session.get(url, headers=headers, timeout=API_TIMEOUT_SHORT)
             elif method.upper() == "POST":
                 if files:
-                    response = requests.post(url, headers=headers, files=files, data=data, timeout=API_TIMEOUT_LONG)
+                    response = session.post(url, headers=headers, files=files, data=data, timeout=API_TIMEOUT_LONG)
                 else:
-                    response = requests.post(url, headers=headers, json=data, timeout=API_TIMEOUT_SHORT)
+                    response = session.post(url, headers=headers, json=data, timeout=API_TIMEOUT_SHORT)
             elif method.upper() == "PUT":
-                response = requests.put(url, headers=headers, json=data, timeout=API_TIMEOUT_SHORT)
+                response = session.put(url, headers=headers, json=data, timeout=API_TIMEOUT_SHORT)
             elif method.upper() == "DELETE":
-                response = requests.delete(url, headers=headers, json=data, timeout=API_TIMEOUT_SHORT)
+                response = session.delete(url, headers=headers, json=data, timeout=API_TIMEOUT_SHORT)
             else:
                 raise Exception(f"Unsupported HTTP method: {method}")
             
@@ -0,0 +1,906 @@
+"""
+WHAPI webhook processing
+Turns queued webhook payloads into groups, contacts and messages
+"""
+import logging
+import psycopg2
+from collections import defaultdict
+from datetime import datetime
+from odoo import api, models
+from ..constants import (
+    PROVIDER_WHAPI, STATUS_DELIVERED, STATUS_READ, STATUS_FAILED, WHATSAPP_GROUP_SUFFIX
+)
+from ..exceptions import WhatsAppConcurrentInsertError
+from ..utils import json_dumps, json_loads
+
+_logger = logging.getLogger(__name__)
+
+
+def _section(data, key):
+    """Return the dict stored under key, or an empty dict for missing or non-dict payloads"""
+    value = data.get(key)
+    return value if isinstance(value, dict) else {}
+
+
+def _text_body(data):
+    text_data = data.get('text') or {}
+    return text_data.get('body', '') if isinstance(text_data, dict) else str(text_data)
+
+
+# Message body per WHAPI message type, looked up once instead of walking an if/elif chain
+_BODY_EXTRACTORS = {
+    'text': _text_body,
+    'image': lambda d: _section(d, 'image').get('caption', 'Image'),
+    'video': lambda d: _section(d, 'video').get('caption', 'Video'),
+    'audio': lambda d: 'Audio message',
+    'document': lambda d: f"Document: {_section(d, 'document').get('filename', 'Document')}",
+}
+
+_MEDIA_TYPES = frozenset(('image', 'video', 'audio', 'document'))
+
+# Message status per WHAPI delivery status; other statuses are ignored
+_STATUS_MAP = {
+    'delivered': STATUS_DELIVERED,
+    'read': STATUS_READ,
+    'failed': STATUS_FAILED,
+}
+
+
+def _parse_metadata(metadata):
+    """Decode stored metadata so it nests as an object instead of an escaped JSON string
+
+    Older rows may hold non-JSON text (e.g. a Python repr); those are kept as they are.
+    """
+    if not metadata:
+        return None
+    try:
+        return json_loads(metadata)
+    except ValueError:
+        return metadata
+
+
+# Keys kept for text messages when the configuration does not store full metadata;
+# 'from' is read back by whatsapp.message to build the sender link
+_MINIMAL_METADATA_KEYS = ('from', 'from_name', 'source')
+
+
+def _message_metadata(message_type, message_data, config=None):
+    """Serialized metadata of a message, trimmed for text messages when the configuration asks for it"""
+    if message_type == 'text' and config and not config.store_full_metadata:
+        return json_dumps({key: message_data[key] for key in _MINIMAL_METADATA_KEYS if key in message_data})
+    return json_dumps(message_data)
+
+
+def _extract_body(message_type, message_data):
+    """Body text shown for a message of the given type"""
+    extractor = _BODY_EXTRACTORS.get(message_type)
+    return extractor(message_data) if extractor else f"{message_type.title()} message"
+
+
+class _ProcessingFailed(Exception):
+    """Raised to roll back the savepoint of a message a helper failed to process"""
+
+
+class WhatsAppWebhookProcessor(models.AbstractModel):
+    _name = 'whatsapp.webhook.processor'
+    _description = 'WhatsApp Webhook Processor'
+
+    @api.model
+    def _process_messages_payload(self, data):
+        """Process a WHAPI messages webhook payload"""
+        # Helpers inherit this env, so they use self.env[model] without re-deriving it per call
+        self = self.sudo().with_context(skip_config_filter=True)
+        try:
+            # Extract messages from webhook data
+            messages = data.get('messages', [])
+            channel_id = data.get('channel_id', '')
+
+            # Resolve configuration by channel_id (if provided)
+            config = None
+            if channel_id:
+                config = self.env['whatsapp.configuration'].get_by_channel_id(channel_id)
+                if not config:
+                    _logger.warning(f"No configuration found for channel_id={channel_id}; incoming data will be processed without configuration linkage")
+            
+            updates = data.get('messages_updates', []) or []
+            removed_ids = data.get('messages_removed', []) or []
+
+            # Only group messages (chat_id ends with @g.us) are processed; the type checks
+            # keep a malformed entry from failing the whole payload with an AttributeError
+            group_messages = [
+                m for m in messages
+                if isinstance(m, dict) and isinstance(m.get('chat_id'), str) and m['chat_id'].endswith(WHATSAPP_GROUP_SUFFIX)
+            ]
+            if len(group_messages) < len(messages):
+                _logger.info(f"Skipping {len(messages) - len(group_messages)} non-group messages")
+
+            # Fetch every group, contact and message the payload refers to up front
+            preloaded = self._preload(group_messages, updates, removed_ids)
+            
+            processed_count = 0
+            error_count = 0
+            # One timestamp for every record touched by this payload
+            now = datetime.now()
+            # New messages are collected by WHAPI id and inserted together
+            new_messages = {}
+
+            # Groups and contacts first seen in this payload are created in one batch each
+            self._create_missing_groups_and_contacts(group_messages, config, preloaded, now)
+
+            # Handle updates/patches (message edits)
+            for update in updates:
+                try:
+                    if self._run_in_savepoint(preloaded, self._process_message_update, update, config, preloaded, now):
+                        processed_count += 1
+                    else:
+                        error_count += 1
+                except WhatsAppConcurrentInsertError:
+                    raise
+                except Exception as e:
+                    _logger.error(f"Error processing message update {update.get('id','')}: {e}")
+                    error_count += 1
+
+            # Handle deletes list (silent event)
+            for removed_id in removed_ids:
+                try:
+                    if self._run_in_savepoint(preloaded, self._process_message_remove, removed_id, preloaded, now):
+                        processed_count += 1
+                    else:
+                        error_count += 1
+                except WhatsAppConcurrentInsertError:
+                    raise
+                except Exception as e:
+                    _logger.error(f"Error processing message removal {removed_id}: {e}")
+                    error_count += 1
+            
+            for message_data in group_messages:
+                try:
+                    # Actions may target a message collected earlier in this payload
+                    if message_data.get('type') == 'action':
+                        failed_count = self._create_pending_messages(new_messages, preloaded)
+                        processed_count -= failed_count
+                        error_count += failed_count
+
+                    # Process the message
+                    success = self._run_in_savepoint(
+                        preloaded, self._process_group_message,
+                        message_data, channel_id, config, preloaded, new_messages, now,
+                    )
+                    if success:
+                        processed_count += 1
+                    else:
+                        error_count += 1
+                        
+                except WhatsAppConcurrentInsertError:
+                    raise
+                except Exception as e:
+                    _logger.error(f"Error processing message {message_data.get('id', 'unknown')}: {e}")
+                    error_count += 1
+
+            failed_count = self._create_pending_messages(new_messages, preloaded)
+            processed_count -= failed_count
+            error_count += failed_count
+            
+            return {
+                'status': 'success',
+                'processed_count': processed_count,
+                'error_count': error_count
+            }
+            
+        except WhatsAppConcurrentInsertError:
+            raise
+        except Exception as e:
+            _logger.error(f"Webhook error: {e}")
+            return {'status': 'error', 'message': str(e)}
+
+    def _run_in_savepoint(self, preloaded, method, *args):
+        """Call a processing helper in its own savepoint and report whether it succeeded
+
+        Helpers return False on failure after catching their own errors, which would
+        leave the transaction aborted by a failed statement; rolling back to the
+        savepoint lets the rest of the payload still be processed.
+        """
+        try:
+            with self.env.cr.savepoint():
+                if not method(*args):
+                    raise _ProcessingFailed()
+        except Exception as e:
+            self._forget_rolled_back_records(preloaded)
+            if isinstance(e, _ProcessingFailed):
+                return False
+            raise
+        return True
+
+    def _forget_rolled_back_records(self, preloaded):
+        """Mark preloaded records created inside a rolled back savepoint as missing again"""
+        for records_by_key in (preloaded or {}).values():
+            records = [record for record in records_by_key.values() if record]
+            if not records:
+                continue
+            existing_ids = set(records[0].browse([record.id for record in records]).exists().ids)
+            for key, record in records_by_key.items():
+                if record and record.id not in existing_ids:
+                    records_by_key[key] = False
+
+    def _preload(self, messages, updates=(), removed_ids=()):
+        """Load the groups, contacts and messages referenced by a webhook payload in three queries
+
+        Each map holds the record for every key found in the payload, or False when
+        the key was looked up but does not exist yet, so helpers can create it directly.
+        """
+        chat_ids, contact_ids, message_ids = set(), set(), set(removed_ids)
+        for message_data in list(messages) + [(update or {}).get('after_update') or {} for update in updates]:
+            chat_ids.add(message_data.get('chat_id'))
+            contact_ids.add(message_data.get('from'))
+            message_ids.add(message_data.get('id'))
+            action_data = message_data.get('action')
+            if isinstance(action_data, dict):
+                message_ids.add(action_data.get('target'))
+        message_ids.update((update or {}).get('id') for update in updates)
+
+        return {
+            'groups': self._preload_records('whatsapp.group', 'group_id', chat_ids),
+            'contacts': self._preload_records('whatsapp.contact', 'contact_id', contact_ids),
+            'messages': self._preload_records('whatsapp.message', 'message_id', message_ids),
+        }
+
+    def _preload_records(self, model_name, field_name, keys):
+        """Map each key to its record, or False when missing, with at most two queries
+
+        Models exposing a _webhook_id_cache resolve known keys from memory; the cached
+        ids are only checked for existence, and the remaining keys are looked up by SQL.
+        """
+        records = dict.fromkeys((key for key in keys if key), False)
+        if not records:
+            return records
+        
+        Model = self.env[model_name]
+        id_cache = getattr(Model, '_webhook_id_cache', None)
+        dbname = self.env.cr.dbname
+        
+        missing = list(records)
+        if id_cache is not None:
+            cached_ids = {}
+            for key in records:
+                record_id = id_cache.get((dbname, key))
+                if record_id:
+                    cached_ids[record_id] = key
+            # Records deleted by another worker are dropped by exists() and searched again
+            for record in Model.browse(list(cached_ids)).exists():
+                records[cached_ids[record.id]] = record
+            missing = [key for key, record in records.items() if not record]
+        
+        if missing:
+            keys_by_id = {record_id: key for key, record_id in self._ids_by_key(Model, field_name, missing).items()}
+            for record in Model.browse(list(keys_by_id)):
+                key = keys_by_id[record.id]
+                records[key] = record
+                if id_cache is not None:
+                    id_cache.set((dbname, key), record.id)
+        return records
+
+    def _ids_by_key(self, Model, field_name, keys):
+        """Map WHAPI keys to record ids with a plain SQL lookup, skipping ORM prefetch"""
+        Model.flush([field_name])
+        self.env.cr.execute(
+            f'SELECT "{field_name}", id FROM "{Model._table}" WHERE "{field_name}" = ANY(%s)',
+            (list(keys),)
+        )
+        return dict(self.env.cr.fetchall())
+
+    def _find_record(self, model_name, field_name, key):
+        """Return the record whose WHAPI id field equals key, or an empty recordset"""
+        Model = self.env[model_name]
+        record_id = self._ids_by_key(Model, field_name, [key]).get(key)
+        return Model.browse(record_id) if record_id else Model.browse()
+
+    def _lookup(self, preloaded, map_key, model_name, field_name, key):
+        """Return the record for a WHAPI id from the preloaded map, resolving it once when absent
+
+        Keys the preload did not cover are searched and then remembered in the map, so
+        later messages of the same payload reuse the answer instead of searching again.
+        """
+        record = preloaded[map_key].get(key) if preloaded else None
+        if record is None:
+            record = self._find_record(model_name, field_name, key)
+            if preloaded and key:
+                preloaded[map_key][key] = record or False
+        return record
+
+    def _find_message(self, message_id, preloaded=None):
+        """Return the stored message with this WHAPI id, preferring the preloaded map"""
+        return self._lookup(preloaded, 'messages', 'whatsapp.message', 'message_id', message_id)
+    
+    def _create_missing_groups_and_contacts(self, messages, config=None, preloaded=None, now=None):
+        """Create the groups and contacts that group messages refer to but that do not exist yet
+
+        Uses one create() per model instead of one per record; the new records are
+        stored in the preloaded maps where _find_or_create_* picks them up.
+        """
+        if not preloaded:
+            return
+        group_vals, contact_vals = {}, {}
+        for message_data in messages:
+            chat_id = message_data.get('chat_id', '')
+            from_contact_id = message_data.get('from', '')
+            if message_data.get('type') == 'action':
+                continue
+            if not message_data.get('id') or not from_contact_id:
+                continue
+            if preloaded['groups'].get(chat_id) is False and chat_id not in group_vals:
+                group_vals[chat_id] = self._prepare_group_vals(chat_id, message_data.get('chat_name', ''), config, now)
+            if preloaded['contacts'].get(from_contact_id) is False and from_contact_id not in contact_vals:
+                contact_vals[from_contact_id] = self._prepare_contact_vals(from_contact_id, message_data.get('from_name', ''), config, now)
+
+        for model_name, key_field, map_key, vals_by_key in (
+            ('whatsapp.group', 'group_id', 'groups', group_vals),
+            ('whatsapp.contact', 'contact_id', 'contacts', contact_vals),
+        ):
+            if not vals_by_key:
+                continue
+            try:
+                with self.env.cr.savepoint():
+                    records = self.env[model_name].create(list(vals_by_key.values()))
+            except Exception as e:
+                # Leave the keys unresolved so each one is created on its own
+                _logger.error(f"Error creating {model_name} records in batch: {e}")
+                continue
+            for record in records:
+                preloaded[map_key][record[key_field]] = record
+            _logger.info(f"Created {len(records)} new {model_name} records: {', '.join(vals_by_key)}")
+
+    def _create_pending_messages(self, new_messages, preloaded=None):
+        """Insert the collected message vals with a single create() and empty the collection
+
+        Falls back to one insert per message when the batch fails, e.g. because another
+        worker stored one of the messages first. Returns the number of messages lost.
+        """
+        if not new_messages:
+            return 0
+        vals_list = list(new_messages.values())
+        new_messages.clear()
+        Message = self.env['whatsapp.message']
+        failed_count = 0
+        try:
+            with self.env.cr.savepoint():
+                messages = Message.create(vals_list)
+        except WhatsAppConcurrentInsertError:
+            raise
+        except Exception as e:
+            _logger.warning(f"Error creating {len(vals_list)} messages in one batch, creating them one by one: {e}")
+            messages = Message.browse()
+            for vals in vals_list:
+                try:
+                    messages |= self._create_or_find('whatsapp.message', 'message_id', vals)
+                except WhatsAppConcurrentInsertError:
+                    raise
+                except Exception as e:
+                    _logger.error(f"Error creating message {vals.get('message_id')}: {e}")
+                    failed_count += 1
+        for message in messages:
+            if preloaded:
+                preloaded['messages'][message.message_id] = message
+            _logger.info(f"Created message {message.message_id} from {message.contact_id.display_name} in group {message.group_id.name}")
+        return failed_count
+
+    def _create_or_find(self, model_name, field_name, vals):
+        """Create a record keyed by a unique WHAPI id, or return the row another worker inserted first
+
+        The unique constraint on field_name makes the insert atomic; on a violation the
+        savepoint is rolled back and the existing row is returned instead.
+        """
+        Model = self.env[model_name]
+        try:
+            with self.env.cr.savepoint():
+                return Model.create(vals)
+        except psycopg2.IntegrityError as e:
+            record = self._find_record(model_name, field_name, vals[field_name])
+            if not record:
+                # The row was committed after this transaction's snapshot was taken, so it
+                # only becomes visible when the payload is processed again
+                raise WhatsAppConcurrentInsertError(
+                    f"{model_name} {vals[field_name]} was created by a concurrent transaction") from e
+            _logger.info(f"{model_name} {vals[field_name]} was created concurrently, using existing record")
+            return record
+
+    def _add_participant(self, group, contact):
+        """Link a contact to a group, returning True when it was not a participant yet
+
+        Inserts straight into the relation table and lets its (group_id, contact_id)
+        primary key reject duplicates, instead of reading every participant of the group.
+        """
+        group.flush(['participant_ids'])
+        self.env.cr.execute("""
+            INSERT INTO whatsapp_group_contact_rel (group_id, contact_id)
+            VALUES (%s, %s)
+            ON CONFLICT DO NOTHING
+        """, (group.id, contact.id))
+        if not self.env.cr.rowcount:
+            return False
+        group.invalidate_cache(['participant_ids'], group.ids)
+        contact.invalidate_cache(['group_ids'], contact.ids)
+        group._invalidate_invite_page_cache()
+        return True
+
+    def _process_group_message(self, message_data, channel_id, config=None, preloaded=None, new_messages=None, now=None):
+        """Process a single group message
+
+        When new_messages is given, the vals of a message to create are stored in it
+        under the WHAPI id and the caller inserts them later with _create_pending_messages.
+        """
+        try:
+            now = now or datetime.now()
+            # Extract message information
+            message_id = message_data.get('id', '')
+            chat_id = message_data.get('chat_id', '')
+            message_type = message_data.get('type', 'text')
+            timestamp = message_data.get('timestamp', 0)
+            chat_name = message_data.get('chat_name', '')
+            from_name = message_data.get('from_name', '')
+            
+            # Handle different message types
+            if message_type == 'action':
+                return self._process_action_message(message_data, channel_id, config, preloaded, now)
+            
+            # Regular message processing
+            from_contact_id = message_data.get('from', '')
+            
+            # Extract message content based on type
+            body = _extract_body(message_type, message_data)
+            
+            if not message_id or not chat_id or not from_contact_id:
+                _logger.warning(f"Missing required fields in message data: {message_data}")
+                return False
+            
+            # Find or create the group
+            group = self._find_or_create_group(chat_id, chat_name, config, preloaded, now)
+            if not group:
+                _logger.error(f"Failed to find or create group for chat_id: {chat_id}")
+                return False
+            
+            # Find or create the contact
+            contact = self._find_or_create_contact(from_contact_id, from_name, config, preloaded, now)
+            if not contact:
+                _logger.error(f"Failed to find or create contact for contact_id: {from_contact_id}")
+                return False
+            
+            # Add contact to group participants if not already added
+            if self._add_participant(group, contact):
+                _logger.info(f"Added contact {contact.display_name} to group {group.name}")
+            
+            # Check if message already exists
+            existing_message = self._find_message(message_id, preloaded)
+            
+            if new_messages is not None and message_id in new_messages:
+                _logger.info(f"Message {message_id} repeated in payload, updating...")
+                new_messages[message_id].update({
+                    'synced_at': now,
+                    'metadata': _message_metadata(message_type, message_data, config),
+                })
+                return True
+            
+            if existing_message:
+                _logger.info(f"Message {message_id} already exists, updating...")
+                existing_message.write({
+                    'synced_at': now,
+                    'metadata': _message_metadata(message_type, message_data, config),
+                })
+                return True
+            
+            # Create new message record
+            message_vals = {
+                'message_id': message_id,
+                'body': body,
+                'message_type': message_type,
+                'chat_id': chat_id,
+                'from_me': message_data.get('from_me', False),
+                'timestamp': timestamp,
+                'status': STATUS_DELIVERED,  # Incoming messages are delivered
+                'contact_id': contact.id,
+                'group_id': group.id,
+                'provider': PROVIDER_WHAPI,
+                'synced_at': now,
+                'metadata': _message_metadata(message_type, message_data, config),
+            }
+
+            if config:
+                message_vals['configuration_id'] = config.id
+            
+            # Handle media content
+            if message_type in _MEDIA_TYPES:
+                media_data = message_data.get(message_type, {})
+                if isinstance(media_data, dict):
+                    message_vals.update({
+                        'media_url': media_data.get('link', ''),
+                        'media_type': message_type,
+                        'caption': media_data.get('caption', ''),
+                    })
+            
+            if new_messages is not None:
+                new_messages[message_id] = message_vals
+                return True
+            
+            message = self._create_or_find('whatsapp.message', 'message_id', message_vals)
+            if preloaded:
+                preloaded['messages'][message_id] = message
+            _logger.info(f"Created message {message_id} from {contact.display_name} in group {group.name}")
+            
+            return True
+            
+        except WhatsAppConcurrentInsertError:
+            raise
+        except Exception as e:
+            _logger.error(f"Error processing group message: {e}")
+            return False
+    
+    def _process_action_message(self, message_data, channel_id, config=None, preloaded=None, now=None):
+        """Process action messages (edit, delete, etc.)"""
+        try:
+            message_id = message_data.get('id', '')
+            chat_id = message_data.get('chat_id', '')
+            chat_name = message_data.get('chat_name', '')
+            action_data = message_data.get('action', {})
+            
+            if not message_id or not chat_id or not action_data:
+                _logger.warning(f"Missing required fields in action message: {message_data}")
+                return False
+            
+            action_type = action_data.get('type', '')
+            target_message_id = action_data.get('target', '')
+            
+            if not action_type or not target_message_id:
+                _logger.warning(f"Missing action type or target in action message: {message_data}")
+                return False
+            
+            # Find or create the group (for logging purposes)
+            self._find_or_create_group(chat_id, chat_name, config, preloaded, now)
+            
+            if action_type == 'edit':
+                return self._handle_message_edit(message_data, target_message_id, action_data, preloaded, now)
+            elif action_type == 'delete':
+                return self._handle_message_delete(message_data, target_message_id, action_data, preloaded, now)
+            else:
+                _logger.info(f"Unhandled action type: {action_type} for message {message_id}")
+                return True  # Don't fail for unknown action types
+            
+        except WhatsAppConcurrentInsertError:
+            raise
+        except Exception as e:
+            _logger.error(f"Error processing action message: {e}")
+            return False
+    
+    def _handle_message_edit(self, message_data, target_message_id, action_data, preloaded=None, now=None):
+        """Handle message edit action"""
+        try:
+            now = now or datetime.now()
+            # Find the original message to edit
+            target_message = self._find_message(target_message_id, preloaded)
+            
+            if not target_message:
+                _logger.warning(f"Target message {target_message_id} not found for edit action")
+                # Create a new message record for the edit action itself
+                return self._create_action_message(message_data, 'Message Edit', preloaded, now)
+            
+            # Get the new content
+            edited_content = action_data.get('edited_content', {})
+            new_body = edited_content.get('body', target_message.body)
+            
+            # Update the original message
+            target_message.write({
+                'body': new_body,
+                'synced_at': now,
+                'metadata': json_dumps({
+                    'original_metadata': _parse_metadata(target_message.metadata),
+                    'edit_action': message_data
+                }),
+            })
+            
+            _logger.info(f"Updated message {target_message_id} with new content: {new_body}")
+            
+            # Also create a system message for the edit action
+            self._create_action_message(message_data, f'Message edited: {new_body}', preloaded, now)
+            
+            return True
+            
+        except WhatsAppConcurrentInsertError:
+            raise
+        except Exception as e:
+            _logger.error(f"Error handling message edit: {e}")
+            return False
+    
+    def _handle_message_delete(self, message_data, target_message_id, action_data, preloaded=None, now=None):
+        """Handle message delete action"""
+        try:
+            now = now or datetime.now()
+            # Find the original message to delete
+            target_message = self._find_message(target_message_id, preloaded)
+            
+            if target_message:
+                # Mark as deleted instead of actually deleting
+                target_message.write({
+                    'body': '[This message was deleted]',
+                    'status': 'deleted',
+                    'synced_at': now,
+                    'metadata': json_dumps({
+                        'original_metadata': _parse_metadata(target_message.metadata),
+                        'delete_action': message_data
+                    }),
+                })
+                _logger.info(f"Marked message {target_message_id} as deleted")
+            else:
+                _logger.warning(f"Target message {target_message_id} not found for delete action")
+            
+            # Create a system message for the delete action
+            self._create_action_message(message_data, 'Message deleted', preloaded, now)
+            
+            return True
+            
+        except WhatsAppConcurrentInsertError:
+            raise
+        except Exception as e:
+            _logger.error(f"Error handling message delete: {e}")
+            return False
+
+    def _process_message_update(self, update_data, config=None, preloaded=None, now=None):
+        """Process WHAPI messages_updates (patch) event to edit a message in place."""
+        try:
+            now = now or datetime.now()
+            msg_id = (update_data or {}).get('id')
+            after = (update_data or {}).get('after_update', {})
+            if not msg_id:
+                return False
+
+            # Try to find existing message
+            target = self._find_message(msg_id, preloaded)
+
+            # Derive new content
+            new_type = after.get('type') or (update_data.get('trigger', {}).get('action', {}).get('edited_type'))
+            new_body = _extract_body(new_type or 'text', after)
+
+            if target:
+                vals = {
+                    'body': new_body,
+                    'message_type': new_type or target.message_type,
+                    'synced_at': now,
+                    'metadata': json_dumps(update_data),
+                }
+                target.write(vals)
+                return True
+
+            # If not found, create it from after_update
+            if after:
+                # Reuse the normal message path to ensure relations are created
+                after_copy = dict(after)
+                after_copy['id'] = msg_id
+                # Ensure text body for text type
+                if new_type == 'text' and 'text' not in after_copy:
+                    after_copy['text'] = {'body': new_body}
+                return self._process_group_message(after_copy, update_data.get('channel_id', ''), config, preloaded, now=now)
+
+            return False
+        except WhatsAppConcurrentInsertError:
+            raise
+        except Exception as e:
+            _logger.error(f"Error processing message update (patch): {e}")
+            return False
+
+    def _process_message_remove(self, message_id: str, preloaded=None, now=None) -> bool:
+        """Process WHAPI messages_removed (delete list) to mark messages deleted."""
+        try:
+            now = now or datetime.now()
+            if not message_id:
+                return False
+            target = self._find_message(message_id, preloaded)
+            if not target:
+                _logger.warning(f"Message {message_id} not found for removal event")
+                return False
+            target.write({
+                'body': '[This message was deleted]',
+                'status': 'deleted',
+                'synced_at': now,
+            })
+            return True
+        except WhatsAppConcurrentInsertError:
+            raise
+        except Exception as e:
+            _logger.error(f"Error processing message removal: {e}")
+            return False
+    
+    def _create_action_message(self, message_data, action_description, preloaded=None, now=None):
+        """Create a system message for actions"""
+        try:
+            now = now or datetime.now()
+            message_id = message_data.get('id', '')
+            chat_id = message_data.get('chat_id', '')
+            timestamp = message_data.get('timestamp', 0)
+            chat_name = message_data.get('chat_name', '')
+            from_name = message_data.get('from_name', 'System')
+            
+            # Find or create the group
+            group = self._find_or_create_group(chat_id, chat_name, preloaded=preloaded, now=now)
+            if not group:
+                return False
+            
+            # Check if action message already exists
+            existing_message = self._find_message(message_id, preloaded)
+            
+            if existing_message:
+                _logger.info(f"Action message {message_id} already exists")
+                return True
+            
+            # Create system message for the action
+            message_vals = {
+                'message_id': message_id,
+                'body': f"[System] {action_description} by {from_name}",
+                'message_type': 'system',
+                'chat_id': chat_id,
+                'from_me': False,
+                'timestamp': timestamp,
+                'status': STATUS_DELIVERED,
+                'group_id': group.id,
+                'provider': 'whapi',
+                'synced_at': now,
+                'metadata': json_dumps(message_data),
+            }
+
+            if getattr(group, 'configuration_id', False):
+                message_vals['configuration_id'] = group.configuration_id.id
+            
+            message = self._create_or_find('whatsapp.message', 'message_id', message_vals)
+            if preloaded:
+                preloaded['messages'][message_id] = message
+            _logger.info(f"Created action message: {action_description}")
+            
+            return True
+            
+        except WhatsAppConcurrentInsertError:
+            raise
+        except Exception as e:
+            _logger.error(f"Error creating action message: {e}")
+            return False
+    
+    def _prepare_group_vals(self, group_id, group_name, config=None, now=None):
+        """Values for a group first seen in a webhook"""
+        now = now or datetime.now()
+        group_vals = {
+            'group_id': group_id,
+            'name': group_name or f"Group {group_id}",
+            'provider': 'whapi',
+            'synced_at': now,
+            'is_active': True,
+        }
+        if config:
+            group_vals['configuration_id'] = config.id
+        return group_vals
+
+    def _prepare_contact_vals(self, contact_id, contact_name, config=None, now=None):
+        """Values for a contact first seen in a webhook"""
+        now = now or datetime.now()
+        contact_vals = {
+            'contact_id': contact_id,
+            'pushname': contact_name or '',
+            'name': contact_name or '',
+            'phone': contact_id if contact_id.isdigit() else '',
+            'provider': 'whapi',
+            'synced_at': now,
+            'isWAContact': True,
+            'is_chat_contact': True,  # This is a chat contact since they sent a message
+            'is_phone_contact': False,
+        }
+        if config:
+            contact_vals['configuration_id'] = config.id
+        return contact_vals
+
+    def _find_or_create_group(self, group_id, group_name, config=None, preloaded=None, now=None):
+        """Find or create a WhatsApp group"""
+        try:
+            now = now or datetime.now()
+            # Search for existing group unless the payload preload already answered
+            group = self._lookup(preloaded, 'groups', 'whatsapp.group', 'group_id', group_id)
+            
+            if group:
+                # Update group name if it has changed
+                if group_name and group.name != group_name:
+                    update_vals = {
+                        'name': group_name,
+                        'synced_at': now,
+                    }
+                    # backfill configuration if missing and we know it from webhook
+                    if config and not group.configuration_id:
+                        update_vals['configuration_id'] = config.id
+                    group.write(update_vals)
+                return group
+            
+            # Create new group
+            group_vals = self._prepare_group_vals(group_id, group_name, config, now)
+            group = self._create_or_find('whatsapp.group', 'group_id', group_vals)
+            if preloaded:
+                preloaded['groups'][group_id] = group
+            _logger.info(f"Created new group: {group.name} ({group_id})")
+            
+            return group
+            
+        except WhatsAppConcurrentInsertError:
+            raise
+        except Exception as e:
+            _logger.error(f"Error finding/creating group {group_id}: {e}")
+            return None
+    
+    def _find_or_create_contact(self, contact_id, contact_name, config=None, preloaded=None, now=None):
+        """Find or create a WhatsApp contact"""
+        try:
+            now = now or datetime.now()
+            # Search for existing contact unless the payload preload already answered
+            contact = self._lookup(preloaded, 'contacts', 'whatsapp.contact', 'contact_id', contact_id)
+            
+            if contact:
+                # Update contact name if it has changed and we have a name
+                if contact_name and contact_name != contact.pushname:
+                    update_vals = {
+                        'pushname': contact_name,
+                        'synced_at': now,
+                        'is_chat_contact': True,  # Mark as chat contact since they messaged
+                    }
+                    if config and not contact.configuration_id:
+                        update_vals['configuration_id'] = config.id
+                    contact.write(update_vals)
+                return contact
+            
+            # Create new contact
+            contact_vals = self._prepare_contact_vals(contact_id, contact_name, config, now)
+            contact = self._create_or_find('whatsapp.contact', 'contact_id', contact_vals)
+            if preloaded:
+                preloaded['contacts'][contact_id] = contact
+            _logger.info(f"Created new contact: {contact.display_name} ({contact_id})")
+            
+            return contact
+            
+        except WhatsAppConcurrentInsertError:
+            raise
+        except Exception as e:
+            _logger.error(f"Error finding/creating contact {contact_id}: {e}")
+            return None
+
+    @api.model
+    def _process_statuses_payload(self, data):
+        """Process a WHAPI delivery status webhook payload
+
+        Statuses are collected first and applied with one search and one write per
+        distinct status, instead of one of each per message.
+        """
+        self = self.sudo().with_context(skip_config_filter=True)
+        try:
+            # Latest reported status per message id
+            new_statuses = {}
+            
+            # Extract status information
+            for entry in data.get('entry', []):
+                for change in entry.get('changes', []):
+                    value = change.get('value', {})
+                    
+                    # Handle message status updates
+                    for status in value.get('statuses', []):
+                        message_id = status.get('id')
+                        status_type = status.get('status')  # sent, delivered, read, failed
+                        
+                        new_status = _STATUS_MAP.get(status_type)
+                        if message_id and new_status:
+                            new_statuses[message_id] = new_status
+            
+            message_ids_by_status = defaultdict(list)
+            for message_id, new_status in new_statuses.items():
+                message_ids_by_status[new_status].append(message_id)
+            
+            Message = self.env['whatsapp.message']
+            for new_status, message_ids in message_ids_by_status.items():
+                messages = Message.search([('message_id', 'in', message_ids)])
+                if messages:
+                    messages.write({'status': new_status})
+            
+            return {'status': 'success'}
+            
+        except WhatsAppConcurrentInsertError:
+            raise
+        except Exception as e:
+            _logger.error(f"Webhook error: {e}")
+            return {'status': 'error', 'message': str(e)}
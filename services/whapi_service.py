@@ -7,16 +7,18 @@ from typing import Dict, List, Optional
 from odoo import api, models, fields
 from odoo.exceptions import AccessError, ValidationError
 from ..constants import (
-    API_TIMEOUT_SHORT, API_TIMEOUT_LONG, WHATSAPP_USER_SUFFIX,
-    MIME_TYPES, IMAGE_HEADERS
+    API_TIMEOUT_SHORT, API_TIMEOUT_LONG, WHATSAPP_USER_SUFFIX
 )
+from ..exceptions import WhatsAppAPIError
+from ..utils import decodes_to_binary, has_image_header, resolve_mime_type, strip_base64_whitespace
+from .http_client import get_session
 
 _logger = logging.getLogger(__name__)
 
 class WhapiService(models.AbstractModel):
     _name = 'whapi.service'
     _description = 'WHAPI Service'
-    
+
     @api.model
     def _get_api_config(self, user_id=None):
         """Get API configuration for current user"""
@@ -60,23 +62,25 @@ class WhapiService(models.AbstractModel):
             headers["Content-Type"] = "application/json"
             headers["accept"] = "application/json"
 
+        session = get_session()
+
         try:
             if method.upper() == "GET":
-                response = requests.get(url, headers=headers, params=params, timeout=API_TIMEOUT_SHORT)
+                response = session.get(url, headers=headers, params=params, timeout=API_TIMEOUT_SHORT)
             elif method.upper() == "POST":
                 if files:
-                    response = requests.post(url, headers=headers, files=files, data=data, timeout=API_TIMEOUT_LONG)
+                    response = session.post(url, headers=headers, files=files, data=data, timeout=API_TIMEOUT_LONG)
                 elif json:
                     _logger.info(f"Sending JSON data: {json}")
-                    response = requests.post(url, headers=headers, json=json, params=params, timeout=API_TIMEOUT_SHORT)
+                    response = session.post(url, headers=headers, json=json, params=params, timeout=API_TIMEOUT_SHORT)
                 else:
-                    response = requests.post(url, headers=headers, json=data, params=params, timeout=API_TIMEOUT_SHORT)
+                    response = session.post(url, headers=headers, json=data, params=params, timeout=API_TIMEOUT_SHORT)
             elif method.upper() == "PUT":
-                response = requests.put(url, headers=headers, json=data, timeout=API_TIMEOUT_SHORT)
+                response = session.put(url, headers=headers, json=data, timeout=API_TIMEOUT_SHORT)
             elif method.upper() == "DELETE":
-                response = requests.delete(url, headers=headers, json=data, timeout=API_TIMEOUT_SHORT)
+                response = session.delete(url, headers=headers, json=data, timeout=API_TIMEOUT_SHORT)
             elif method.upper() == "HEAD":
-                response = requests.head(url, headers=headers, timeout=API_TIMEOUT_SHORT)
+                response = session.head(url, headers=headers, timeout=API_TIMEOUT_SHORT)
             else:
                 raise Exception(f"Unsupported HTTP method: {method}")
             
@@ -95,13 +99,15 @@ class WhapiService(models.AbstractModel):
         
         except requests.exceptions.RequestException as e:
             _logger.error(f"WHAPI request failed: {e}")
-            if hasattr(e, 'response') and e.response is not None:
+            response = getattr(e, 'response', None)
+            if response is not None:
                 try:
-                    error_data = e.response.json()
-                    raise Exception(f"API request failed: {error_data}")
+                    error_data = response.json()
                 except ValueError:
-                    raise Exception(f"API request failed: {e.response.text}")
-            raise Exception(f"API request failed: {str(e)}")
+                    error_data = response.text
+                raise WhatsAppAPIError(f"API request failed: {error_data}", status_code=response.status_code,
+                                       response_data=error_data, provider='whapi') from e
+            raise WhatsAppAPIError(f"API request failed: {str(e)}", provider='whapi') from e
 
     def check_health(self) -> Dict:
         """Check WHAPI health status"""
@@ -115,8 +121,12 @@ class WhapiService(models.AbstractModel):
     # Media Management Methods (REMOVED - Using direct media sending only)
     # All media upload methods removed - using new data URL approach only
 
-    def send_media_message(self, to: str, media_data: str, filename: str, message_type: str = "image", caption: str = ""):
-        """Send media message to WHAPI using JSON format with data URL - NEW APPROACH ONLY"""
+    def send_media_message(self, to: str, media_data: str, filename: str, message_type: str = "image", caption: str = "",
+                           media_memo: Optional[Dict] = None):
+        """Send media message to WHAPI using JSON format with data URL - NEW APPROACH ONLY
+
+        media_memo is the memo of _fix_double_encoding, shared by a bulk send of one file.
+        """
         try:
             # Use the exact format from the working curl example
             endpoint = f'/messages/media/{message_type}'
@@ -124,7 +134,7 @@ class WhapiService(models.AbstractModel):
             # Validate and convert to data URL format
             if isinstance(media_data, str):
                 # Check for double encoding issue and fix if needed
-                corrected_media_data = self._fix_double_encoding(media_data)
+                corrected_media_data = self._fix_double_encoding(media_data, media_memo)
                 
                 mime_type = self._get_mime_type(message_type, filename)
                 data_url = f"data:{mime_type};name={filename};base64,{corrected_media_data}"
@@ -134,12 +144,9 @@ class WhapiService(models.AbstractModel):
                     # Try to decode as string first
                     potential_string = media_data.decode('utf-8')
                     
-                    # Check if this string is double encoded and fix if needed
-                    if self._is_double_encoded(potential_string):
-                        corrected_string = self._fix_double_encoding(potential_string)
-                        data_url_data = corrected_string
-                    else:
-                        data_url_data = potential_string
+                    # Fix double encoding if needed; returns the cleaned data unchanged otherwise,
+                    # so no separate _is_double_encoded() pass over the payload is required
+                    data_url_data = self._fix_double_encoding(potential_string)
                         
                 except UnicodeDecodeError:
                     # True binary data - encode to base64
@@ -203,26 +210,50 @@ class WhapiService(models.AbstractModel):
     def _is_double_encoded(self, data: str) -> bool:
         """Check if data is double encoded"""
         try:
-            clean_data = data.replace('\n', '').replace('\r', '').replace(' ', '')
+            clean_data = strip_base64_whitespace(data)
+            if decodes_to_binary(clean_data):
+                return False
             first_decode = base64.b64decode(clean_data, validate=True)
             
             try:
-                potential_base64 = first_decode.decode('utf-8')
-                # Check if it looks like base64 with image headers
-                for header in IMAGE_HEADERS:
-                    if potential_base64.startswith(header):
-                        return True
-                return self._looks_like_base64(potential_base64)
+                # Check if it looks like base64 with image headers, on the raw bytes
+                if has_image_header(first_decode):
+                    return True
+                return self._looks_like_base64(first_decode.decode('utf-8'))
             except UnicodeDecodeError:
                 return False
         except Exception:
             return False
     
-    def _fix_double_encoding(self, data: str) -> str:
-        """Fix double encoding issue from Odoo binary fields"""
+    def _fix_double_encoding(self, data: str, memo: Optional[Dict] = None) -> str:
+        """Fix double encoding issue from Odoo binary fields
+
+        memo is a dict owned by the caller for the duration of one bulk send, so the same
+        file sent to many recipients (or prepared by the caller and checked again here) is
+        only scanned once.
+        """
+        if memo is None or not isinstance(data, str):
+            return self._fix_double_encoding_uncached(data)
+
+        # Entries keep the payload alive, so its id() cannot be reused while the memo exists
+        cached = memo.get(id(data))
+        if cached:
+            return cached[1]
+
+        fixed = self._fix_double_encoding_uncached(data)
+        memo[id(data)] = (data, fixed)
+        memo[id(fixed)] = (fixed, fixed)
+        return fixed
+
+    def _fix_double_encoding_uncached(self, data: str) -> str:
+        """Double encoding check of _fix_double_encoding, without the memo"""
         try:
             # Clean the base64 data first
-            clean_data = data.replace('\n', '').replace('\r', '').replace(' ', '')
+            clean_data = strip_base64_whitespace(data)
+            
+            # Binary content (the common case) is not double encoded, skip the full decode
+            if decodes_to_binary(clean_data):
+                return clean_data
             
             # Try to decode and check if it's double encoded
             try:
@@ -230,19 +261,18 @@ class WhapiService(models.AbstractModel):
                 
                 # Check if the first decode result is still base64 by trying to decode it as text
                 try:
-                    potential_base64 = first_decode.decode('utf-8')
-                    
-                    # Check if this looks like base64 by checking for image headers
-                    for header in IMAGE_HEADERS:
-                        if potential_base64.startswith(header):
-                            # Validate this is actually valid base64 by decoding it
-                            try:
-                                base64.b64decode(potential_base64, validate=True)
-                                return potential_base64  # Return the corrected base64
-                            except Exception:
-                                break
+                    # Check for image headers on the raw bytes before decoding the whole payload as text
+                    if has_image_header(first_decode):
+                        potential_base64 = first_decode.decode('ascii')
+                        # Validate this is actually valid base64 by decoding it
+                        try:
+                            base64.b64decode(potential_base64, validate=True)
+                            return potential_base64  # Return the corrected base64
+                        except Exception:
+                            pass
                     
                     # Additional check: if the decoded string is mostly base64 characters
+                    potential_base64 = first_decode.decode('utf-8')
                     if self._looks_like_base64(potential_base64):
                         try:
                             base64.b64decode(potential_base64, validate=True)
@@ -279,15 +309,7 @@ class WhapiService(models.AbstractModel):
 
     def _get_mime_type(self, message_type: str, filename: str) -> str:
         """Get MIME type based on message type and filename"""
-        if message_type in MIME_TYPES:
-            type_map = MIME_TYPES[message_type]
-            if filename:
-                for ext, mime in type_map.items():
-                    if ext != 'default' and filename.lower().endswith(ext):
-                        return mime
-            return type_map['default']
-        
-        return 'application/octet-stream'
+        return resolve_mime_type(message_type, filename)
 
     # Contact Management Methods
     def get_contacts(self, count: int = 100, offset: int = 0) -> Dict:
@@ -340,7 +362,7 @@ class WhapiService(models.AbstractModel):
             return result
         except Exception as e:
             _logger.error(f"Failed to check contacts: {e}")
-            return {"contacts": []}
+            return {"contacts": [], "error": str(e)}
 
     # Group Management Methods
     def get_groups(self, count: int = 100, offset: int = 0) -> Dict:
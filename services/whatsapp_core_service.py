@@ -9,6 +9,7 @@ from .whatsapp_provider_factory import WhatsAppProviderFactory
 from .dto import MessageDTO, MediaMessageDTO, ContactDTO, GroupDTO
 from .transformers import MessageTransformer
 from ..constants import WHATSAPP_GROUP_SUFFIX
+from ..models.whatsapp_audit_log import batch_audit_logs
 import logging
 
 _logger = logging.getLogger(__name__)
@@ -21,6 +22,7 @@ class WhatsAppCoreService(models.AbstractModel):
     _description = 'WhatsApp Core Service'
     
     @api.model
+    @batch_audit_logs
     def send_text_message(self, to: str, message: str, user_id: int = None, **kwargs) -> Dict:
         """
         Send text message using configured provider
@@ -79,6 +81,7 @@ class WhatsAppCoreService(models.AbstractModel):
             }
     
     @api.model
+    @batch_audit_logs
     def send_media_message(self, to: str, media_data: bytes, filename: str, 
                           media_type: str = 'image', caption: str = '', 
                           user_id: int = None, **kwargs) -> Dict:
@@ -151,6 +154,7 @@ class WhatsAppCoreService(models.AbstractModel):
             }
     
     @api.model
+    @batch_audit_logs
     def create_group(self, name: str, participants: List[str], description: str = '', 
                     user_id: int = None, **kwargs) -> Dict:
         """
@@ -213,6 +217,7 @@ class WhatsAppCoreService(models.AbstractModel):
             }
     
     @api.model
+    @batch_audit_logs
     def sync_contacts(self, user_id: int = None, **kwargs) -> Dict:
         """
         Sync contacts from provider
@@ -262,6 +267,7 @@ class WhatsAppCoreService(models.AbstractModel):
             }
     
     @api.model
+    @batch_audit_logs
     def sync_groups(self, user_id: int = None, **kwargs) -> Dict:
         """
         Sync groups from provider
@@ -514,14 +520,14 @@ class WhatsAppCoreService(models.AbstractModel):
                       provider: str, error: str = None):
         """Log operation for observability"""
         try:
-            self.env['whatsapp.audit.log'].sudo().create({
+            self.env['whatsapp.audit.log']._create_log({
                 'operation': operation,
                 'provider': provider,
                 'success': success,
                 'response_time': response_time,
                 'error_message': error,
                 'timestamp': fields.Datetime.now(),
-                'user_id': self.env.user.id,
+                'user_id': self.env.uid,
             })
         except Exception as e:
             # Don't fail operations due to logging issues
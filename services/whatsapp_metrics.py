@@ -4,9 +4,11 @@ Metrics collection and monitoring utilities
 """
 import time
 from collections import defaultdict
+from datetime import timedelta
 from typing import Dict, List
 from odoo import models, api, fields
 from ..constants import PROVIDERS
+from ..utils import now_isoformat
 import logging
 
 _logger = logging.getLogger(__name__)
@@ -24,14 +26,14 @@ class WhatsAppMetrics(models.AbstractModel):
         """Record API call metrics"""
         try:
             # Create audit log entry
-            self.env['whatsapp.audit.log'].sudo().create({
+            self.env['whatsapp.audit.log']._create_log({
                 'provider': provider,
                 'operation': operation,
                 'success': success,
                 'response_time': response_time,
                 'error_message': error,
                 'timestamp': fields.Datetime.now(),
-                'user_id': self.env.user.id,
+                'user_id': self.env.uid,
             })
         except Exception as e:
             _logger.error(f"Failed to record metrics: {e}")
@@ -42,28 +44,32 @@ class WhatsAppMetrics(models.AbstractModel):
         try:
             domain = [
                 ('provider', '=', provider),
-                ('timestamp', '>=', fields.Datetime.now() - 
-                 fields.Datetime.to_datetime(f'{days} days ago'))
+                ('timestamp', '>=', fields.Datetime.now() - timedelta(days=days))
             ]
             
-            logs = self.env['whatsapp.audit.log'].search(domain)
+            # Only the three columns used below, instead of prefetching every stored field
+            logs = self.env['whatsapp.audit.log'].search_read(domain, ['operation', 'success', 'response_time'])
             
+            # Counts, response times and the per-operation breakdown in a single pass
             total_calls = len(logs)
-            successful_calls = len(logs.filtered('success'))
-            failed_calls = total_calls - successful_calls
-            
-            response_times = [log.response_time for log in logs if log.response_time]
-            avg_response_time = sum(response_times) / len(response_times) if response_times else 0
-            
-            # Group by operation
+            successful_calls = 0
+            response_time_sum = 0.0
+            response_time_count = 0
             operations = defaultdict(lambda: {'total': 0, 'success': 0, 'failed': 0})
             for log in logs:
-                op = operations[log.operation]
+                op = operations[log['operation']]
                 op['total'] += 1
-                if log.success:
+                if log['success']:
+                    successful_calls += 1
                     op['success'] += 1
                 else:
                     op['failed'] += 1
+                if log['response_time']:
+                    response_time_sum += log['response_time']
+                    response_time_count += 1
+            
+            failed_calls = total_calls - successful_calls
+            avg_response_time = response_time_sum / response_time_count if response_time_count else 0
             
             return {
                 'provider': provider,
@@ -127,13 +133,8 @@ class WhatsAppMetrics(models.AbstractModel):
         """Get system health status"""
         try:
             # Check recent errors
-            recent_errors = self.env['whatsapp.audit.log'].search([
-                ('success', '=', False),
-                ('timestamp', '>=', fields.Datetime.now() - 
-                 fields.Datetime.to_datetime('1 hour ago'))
-            ])
-            
-            error_rate = len(recent_errors)
+            error_rate = self.env['whatsapp.audit.log']._count_failures_since(
+                fields.Datetime.now() - timedelta(hours=1))
             
             # Check provider connectivity
             providers_status = {}
@@ -159,12 +160,12 @@ class WhatsAppMetrics(models.AbstractModel):
                 'healthy': overall_healthy,
                 'error_rate_last_hour': error_rate,
                 'providers_status': providers_status,
-                'timestamp': fields.Datetime.now().isoformat()
+                'timestamp': now_isoformat()
             }
         except Exception as e:
             _logger.error(f"Health check failed: {e}")
             return {
                 'healthy': False,
                 'error': str(e),
-                'timestamp': fields.Datetime.now().isoformat()
+                'timestamp': now_isoformat()
             }
@@ -21,6 +21,9 @@ class WhapiWebhookManager:
             "Authorization": f"Bearer {api_token}",
             "Content-Type": "application/json"
         }
+        # Keep-alive session so consecutive calls reuse the TLS connection
+        self.session = requests.Session()
+        self.session.headers.update(self.headers)
     
     def set_webhook(self, webhook_url, events=None):
         """Set webhook URL for WHAPI account"""
@@ -35,7 +38,7 @@ class WhapiWebhookManager:
         }
         
         try:
-            response = requests.post(endpoint, json=payload, headers=self.headers)
+            response = self.session.post(endpoint, json=payload)
             
             if response.status_code == 200:
                 logger.info("✅ Webhook set successfully!")
@@ -53,7 +56,7 @@ class WhapiWebhookManager:
         endpoint = f"{self.base_url}/settings/webhook"
         
         try:
-            response = requests.get(endpoint, headers=self.headers)
+            response = self.session.get(endpoint)
             
             if response.status_code == 200:
                 webhook_info = response.json()
@@ -1,6 +1,9 @@
 from .test_adapters import TestWhapiAdapter, TestTwilioAdapter, TestMockAdapter
 from .test_integration import TestWhatsAppCoreService, TestProviderFactory  
 from .test_webhooks import TestWebhookSimulation
+from .test_security import TestContactAccess
+from .test_queues import TestWebhookQueue, TestSyncJobQueue, TestSyncJobEndpoint
+from .test_contacts import TestContactStatusCheck
 
 __all__ = [
     'TestWhapiAdapter',
@@ -8,5 +11,10 @@ __all__ = [
     'TestMockAdapter',
     'TestWhatsAppCoreService',
     'TestProviderFactory',
-    'TestWebhookSimulation'
+    'TestWebhookSimulation',
+    'TestContactAccess',
+    'TestWebhookQueue',
+    'TestSyncJobQueue',
+    'TestSyncJobEndpoint',
+    'TestContactStatusCheck',
 ]
@@ -0,0 +1,44 @@
+"""
+Tests for the WhatsApp status check of contacts
+"""
+from unittest.mock import Mock
+from odoo.tests.common import TransactionCase
+from ..exceptions import WhatsAppAPIError
+
+
+class TestContactStatusCheck(TransactionCase):
+    """Test the batched WHAPI status check"""
+
+    def setUp(self):
+        super().setUp()
+        Contact = self.env['whatsapp.contact']
+        self.phone_contact = Contact.create({'contact_id': '201000000001', 'phone': '+20 100 000 0001'})
+        self.id_contact = Contact.create({'contact_id': '201000000002@s.whatsapp.net'})
+        self.missing_contact = Contact.create({'contact_id': '201000000003', 'isWAContact': True})
+        self.contacts = self.phone_contact | self.id_contact | self.missing_contact
+        self.api_service = Mock()
+
+    def test_numbers_are_matched_after_normalization(self):
+        """Phones and contact ids match the digits echoed back by WHAPI"""
+        self.api_service.check_contacts_exist.return_value = {'contacts': [
+            {'input': '201000000001', 'status': 'valid', 'wa_id': '201000000001'},
+            {'input': '201000000002', 'status': 'invalid'},
+        ]}
+
+        valid = self.contacts._check_whatsapp_status_batch(self.api_service)
+
+        sent_numbers = self.api_service.check_contacts_exist.call_args[0][0]
+        self.assertEqual(sorted(sent_numbers), ['201000000001', '201000000002', '201000000003'])
+        self.assertEqual(valid, self.phone_contact)
+        self.assertTrue(self.phone_contact.isWAContact)
+        self.assertFalse(self.id_contact.isWAContact)
+        # Not in the response, so the previous status is kept
+        self.assertTrue(self.missing_contact.isWAContact)
+
+    def test_failed_request_writes_nothing(self):
+        self.api_service.check_contacts_exist.return_value = {'contacts': [], 'error': 'Service unavailable'}
+
+        with self.assertRaises(WhatsAppAPIError):
+            self.contacts._check_whatsapp_status_batch(self.api_service)
+
+        self.assertTrue(self.missing_contact.isWAContact)
@@ -49,6 +49,27 @@ class TestWhatsAppCoreService(TransactionCase):
             '+1234567890', 'Test integration message'
         )
     
+    def test_send_logs_are_created_in_one_batch(self):
+        """The provider's API log and the operation log of a send share one insert"""
+        AuditLog = self.env['whatsapp.audit.log']
+        
+        def send_text_message(to, message):
+            AuditLog._create_log({'operation': 'api_send_message', 'provider': 'whapi', 'success': True})
+            return {'success': True, 'message_id': 'test_msg_batch'}
+        
+        mock_provider = Mock()
+        mock_provider.provider_name = 'whapi'
+        mock_provider.send_text_message.side_effect = send_text_message
+        
+        create = type(AuditLog).create
+        with patch.object(self.core_service, '_get_provider_for_user', return_value=mock_provider), \
+                patch.object(type(AuditLog), 'create', autospec=True, side_effect=create) as mock_create:
+            self.core_service.send_text_message(to='+1234567890', message='Batched logs')
+        
+        mock_create.assert_called_once()
+        operations = [vals['operation'] for vals in mock_create.call_args[0][1]]
+        self.assertEqual(operations, ['api_send_message', 'send_text_message'])
+    
     def test_send_media_message_integration(self):
         """Test end-to-end media message sending"""
         mock_provider = Mock()
@@ -0,0 +1,206 @@
+"""
+Tests for the webhook queue and the sync job queue
+"""
+import json
+from unittest.mock import patch
+from odoo.tests.common import TransactionCase, HttpCase
+from ..constants import WEBHOOK_QUEUE_MAX_ATTEMPTS, WHATSAPP_GROUP_SUFFIX
+from ..exceptions import WhatsAppConcurrentInsertError
+
+
+class TestWebhookQueue(TransactionCase):
+    """Test queued webhook payloads and their processing cron"""
+
+    def setUp(self):
+        super().setUp()
+        self.queue = self.env['whatsapp.webhook.queue']
+        self.processor_class = type(self.env['whatsapp.webhook.processor'])
+        self.payload = {
+            "messages": [
+                {
+                    "id": "queue_msg_123",
+                    "type": "text",
+                    "from": "1234567890",
+                    "from_name": "Queue Member",
+                    "chat_id": f"1234567890-queue{WHATSAPP_GROUP_SUFFIX}",
+                    "chat_name": "Queue Group",
+                    "timestamp": 1634567890,
+                    "text": {"body": "Queued message"},
+                    "from_me": False
+                }
+            ],
+            "channel_id": "queue_channel"
+        }
+
+    def test_enqueue_stores_payload(self):
+        """Enqueue only stores the payload, on the lane of its channel"""
+        entry = self.queue.enqueue('messages', self.payload)
+
+        self.assertEqual(entry.state, 'pending')
+        self.assertEqual(entry.attempts, 0)
+        self.assertEqual(json.loads(entry.payload), self.payload)
+        self.assertEqual(entry.lane, self.queue._get_lane('queue_channel'))
+        self.assertFalse(self.env['whatsapp.message'].search([('message_id', '=', 'queue_msg_123')]))
+
+    def test_cron_processes_pending_entries(self):
+        """The cron turns pending payloads into records and marks them done"""
+        entry = self.queue.enqueue('messages', self.payload)
+
+        self.queue._cron_process_queue()
+
+        self.assertEqual(entry.state, 'done')
+        self.assertEqual(entry.attempts, 1)
+        self.assertTrue(entry.processed_at)
+        messages = self.env['whatsapp.message'].search([('message_id', '=', 'queue_msg_123')])
+        self.assertEqual(len(messages), 1)
+
+    def test_failed_entry_is_retried_up_to_max_attempts(self):
+        """A failing payload stays pending until it used all its attempts"""
+        entry = self.queue.enqueue('messages', self.payload)
+        failure = {'status': 'error', 'message': 'Processing failed'}
+
+        with patch.object(self.processor_class, '_process_messages_payload', return_value=failure):
+            for attempt in range(1, WEBHOOK_QUEUE_MAX_ATTEMPTS + 1):
+                self.queue._cron_process_queue()
+                self.assertEqual(entry.attempts, attempt)
+                self.assertEqual(entry.state, 'pending' if attempt < WEBHOOK_QUEUE_MAX_ATTEMPTS else 'error')
+
+            # Entries in error are not picked up again
+            self.queue._cron_process_queue()
+
+        self.assertEqual(entry.attempts, WEBHOOK_QUEUE_MAX_ATTEMPTS)
+        self.assertEqual(entry.error_message, 'Processing failed')
+
+    def test_concurrent_insert_is_retried_before_later_payloads(self):
+        """A payload racing another worker's insert holds back the rest of its lane"""
+        entry = self.queue.enqueue('messages', self.payload)
+        later = self.queue.enqueue('messages', self.payload)
+        race = WhatsAppConcurrentInsertError('whatsapp.message queue_msg_123 was created by a concurrent transaction')
+
+        with patch.object(self.processor_class, '_process_messages_payload', side_effect=race) as process:
+            self.queue._cron_process_queue()
+
+        self.assertEqual(process.call_count, 1)
+        self.assertEqual(entry.state, 'pending')
+        self.assertEqual(entry.attempts, 1)
+        self.assertEqual(later.state, 'pending')
+        self.assertEqual(later.attempts, 0)
+
+        self.queue._cron_process_queue()
+        self.assertEqual(entry.state, 'done')
+        self.assertEqual(later.state, 'done')
+
+    def test_repeated_concurrent_insert_ends_in_error(self):
+        """A race that keeps happening uses the attempts like any other failure"""
+        entry = self.queue.enqueue('messages', self.payload)
+        race = WhatsAppConcurrentInsertError('whatsapp.message queue_msg_123 was created by a concurrent transaction')
+
+        with patch.object(self.processor_class, '_process_messages_payload', side_effect=race):
+            for _attempt in range(WEBHOOK_QUEUE_MAX_ATTEMPTS + 1):
+                self.queue._cron_process_queue()
+
+        self.assertEqual(entry.state, 'error')
+        self.assertEqual(entry.attempts, WEBHOOK_QUEUE_MAX_ATTEMPTS)
+
+
+class TestSyncJobQueue(TransactionCase):
+    """Test sync jobs queued by the sync endpoints"""
+
+    def setUp(self):
+        super().setUp()
+        # Jobs run on their own cursor, which shares the test transaction in test mode
+        self.registry.enter_test_mode(self.cr)
+        self.addCleanup(self.registry.leave_test_mode)
+        self.Job = self.env['whatsapp.sync.job']
+        self.contact_class = type(self.env['whatsapp.contact'])
+
+    def test_enqueue_creates_pending_job(self):
+        """The job belongs to the requesting user and keeps the sync parameters"""
+        job = self.Job.enqueue('messages', count=10)
+
+        self.assertEqual(job.state, 'pending')
+        self.assertEqual(job.user_id, self.env.user)
+        self.assertEqual(json.loads(job.params), {'count': 10})
+        self.assertEqual(job.to_dict(), {
+            'job_id': job.id,
+            'kind': 'messages',
+            'state': 'pending',
+            'result': None,
+            'error': None,
+        })
+
+    def test_cron_runs_job_as_requesting_user(self):
+        """The sync runs as the user who queued it and its result is stored"""
+        calls = []
+
+        def fake_sync(model):
+            calls.append(model.env.uid)
+            return {'success': True, 'count': 3}
+
+        job = self.Job.enqueue('contacts')
+        with patch.object(self.contact_class, 'sync_all_contacts_from_api', fake_sync):
+            self.Job._cron_process_jobs()
+
+        self.assertEqual(calls, [self.env.uid])
+        self.assertEqual(job.state, 'done')
+        self.assertEqual(job.to_dict()['result'], {'success': True, 'count': 3})
+
+    def test_job_committing_part_way_is_marked_done(self):
+        """Syncs commit their progress, which must not break the job bookkeeping"""
+        def committing_sync(model):
+            model.env.cr.commit()
+            return {'success': True, 'count': 1}
+
+        job = self.Job.enqueue('contacts')
+        with patch.object(self.contact_class, 'sync_all_contacts_from_api', committing_sync):
+            self.Job._cron_process_jobs()
+
+        self.assertEqual(job.state, 'done')
+
+    def test_failed_job_records_error(self):
+        """A sync reporting a failure puts the job in error with its message"""
+        failure = {'success': False, 'message': 'No accessible WhatsApp configuration found for current user'}
+
+        job = self.Job.enqueue('contacts')
+        with patch.object(self.contact_class, 'sync_all_contacts_from_api', return_value=failure):
+            self.Job._cron_process_jobs()
+
+        self.assertEqual(job.state, 'error')
+        self.assertEqual(job.error_message, failure['message'])
+        self.assertTrue(job.processed_at)
+
+
+class TestSyncJobEndpoint(HttpCase):
+    """Test the sync job status endpoint"""
+
+    def _get_job_status(self, job_id):
+        response = self.url_open(
+            f'/api/whatsapp/sync/jobs/{job_id}',
+            data=json.dumps({'jsonrpc': '2.0', 'method': 'call', 'params': {}}),
+            headers={'Content-Type': 'application/json'}
+        )
+        self.assertEqual(response.status_code, 200)
+        return response.json()['result']
+
+    def test_owner_gets_job_status(self):
+        self.authenticate('admin', 'admin')
+        admin = self.env.ref('base.user_admin')
+        job = self.env['whatsapp.sync.job'].with_user(admin).enqueue('groups')
+
+        self.assertEqual(self._get_job_status(job.id), {
+            'job_id': job.id,
+            'kind': 'groups',
+            'state': 'pending',
+            'result': None,
+            'error': None,
+        })
+
+    def test_other_users_jobs_are_hidden(self):
+        other_user = self.env['res.users'].create({
+            'name': 'Other Sync User',
+            'login': 'whatsapp_other_sync_user',
+        })
+        job = self.env['whatsapp.sync.job'].with_user(other_user).enqueue('groups')
+
+        self.authenticate('admin', 'admin')
+        self.assertEqual(self._get_job_status(job.id), {'error': 'Sync job not found'})
@@ -0,0 +1,98 @@
+"""
+Tests for the configuration based access to WhatsApp contacts
+"""
+from unittest.mock import MagicMock, patch
+from odoo.tests.common import TransactionCase
+from ..controllers.whatsapp_controller import WhatsAppController
+
+
+class TestContactAccess(TransactionCase):
+    """Contacts visible to WhatsApp users through the configuration record rule"""
+
+    def setUp(self):
+        super().setUp()
+        Config = self.env['whatsapp.configuration']
+        self.user_group = self.env.ref('whatsapp_integration.group_whatsapp_user')
+        self.user = self.env['res.users'].create({
+            'name': 'WhatsApp User',
+            'login': 'whatsapp_access_user',
+            'groups_id': [(6, 0, [self.env.ref('base.group_user').id, self.user_group.id])],
+        })
+        self.admin = self.env['res.users'].create({
+            'name': 'WhatsApp Admin',
+            'login': 'whatsapp_access_admin',
+            'groups_id': [(6, 0, [
+                self.env.ref('base.group_user').id,
+                self.user_group.id,
+                self.env.ref('whatsapp_integration.group_whatsapp_admin').id,
+            ])],
+        })
+
+        self.own_config = Config.create({
+            'name': 'Own Config',
+            'token': 'own_token',
+            'supervisor_phone': '+1234567890',
+            'provider': 'whapi',
+            'user_ids': [(4, self.user.id)],
+        })
+        self.group_config = Config.create({
+            'name': 'Group Config',
+            'token': 'group_token',
+            'supervisor_phone': '+1234567890',
+            'provider': 'whapi',
+            'group_ids': [(4, self.user_group.id)],
+        })
+        self.other_config = Config.create({
+            'name': 'Other Config',
+            'token': 'other_token',
+            'supervisor_phone': '+1234567890',
+            'provider': 'whapi',
+        })
+
+        Contact = self.env['whatsapp.contact']
+        self.own_contact = Contact.create({'contact_id': '100001', 'configuration_id': self.own_config.id})
+        self.group_contact = Contact.create({'contact_id': '100002', 'configuration_id': self.group_config.id})
+        self.other_contact = Contact.create({'contact_id': '100003', 'configuration_id': self.other_config.id})
+        self.unassigned_contact = Contact.create({'contact_id': '100004'})
+        self.all_contacts = self.own_contact | self.group_contact | self.other_contact | self.unassigned_contact
+
+    def _visible_contacts(self, user):
+        return self.env['whatsapp.contact'].with_user(user).search([('id', 'in', self.all_contacts.ids)])
+
+    def test_user_sees_directly_assigned_configuration_only(self):
+        """A direct assignment hides the configurations shared with the user's groups"""
+        self.assertEqual(self._visible_contacts(self.user), self.own_contact)
+        Contact = self.env['whatsapp.contact'].with_user(self.user)
+        self.assertEqual(Contact.search_count([('id', 'in', self.all_contacts.ids)]), 1)
+
+    def test_user_falls_back_to_group_configurations(self):
+        """Without a direct assignment, the configurations of the user's groups count"""
+        self.own_config.write({'user_ids': [(3, self.user.id)]})
+        self.assertEqual(self._visible_contacts(self.user), self.group_contact)
+
+    def test_admin_sees_every_contact(self):
+        self.assertEqual(self._visible_contacts(self.admin), self.all_contacts)
+
+    def test_user_can_create_and_update_unassigned_contacts(self):
+        """Group and participant syncs create contacts before they get a configuration"""
+        Contact = self.env['whatsapp.contact'].with_user(self.user)
+        contact = Contact.create({'contact_id': '100005', 'name': 'Participant'})
+        contact.write({'pushname': 'Participant'})
+        self.assertEqual(contact.sudo().display_name, 'Participant')
+
+    def test_groups_endpoint_skips_hidden_participants(self):
+        """Participants outside the user's configurations are left out of the members"""
+        group = self.env['whatsapp.group'].create({
+            'name': 'Mixed Group',
+            'group_id': '120363000000000001@g.us',
+            'configuration_id': self.own_config.id,
+            'participant_ids': [(6, 0, (self.own_contact | self.other_contact | self.unassigned_contact).ids)],
+        })
+        fake_request = MagicMock(env=self.env(user=self.user))
+        with patch('odoo.addons.whatsapp_integration.controllers.whatsapp_controller.request', fake_request):
+            groups = WhatsAppController().get_all_groups()
+
+        self.assertIsInstance(groups, list)
+        mixed = next(values for values in groups if values['id'] == group.id)
+        self.assertEqual([member['id'] for member in mixed['members']], self.own_contact.ids)
+        self.assertEqual(mixed['member_count'], 1)
@@ -3,7 +3,6 @@ Webhook simulation tests
 """
 import unittest
 import json
-from unittest.mock import Mock, patch
 from odoo.tests.common import HttpCase
 from odoo.http import request
 from ..constants import WHATSAPP_USER_SUFFIX, WHATSAPP_GROUP_SUFFIX
@@ -24,6 +23,21 @@ class TestWebhookSimulation(HttpCase):
             'active': True
         })
     
+    def _post_webhook(self, kind, payload):
+        """Post a payload to the WHAPI webhook route and check it was queued"""
+        response = self.url_open(
+            f'/whatsapp/webhook/whapi/{kind}',
+            data=json.dumps(payload),
+            headers={'Content-Type': 'application/json'}
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['result']['status'], 'queued')
+        return response
+    
+    def _process_queue(self):
+        """Run the queue cron the way the cron worker would, after the webhook returned"""
+        self.env['whatsapp.webhook.queue']._cron_process_queue()
+    
     def test_whapi_message_webhook(self):
         """Test WHAPI message webhook processing"""
         # Simulate WHAPI webhook payload
@@ -46,27 +60,14 @@ class TestWebhookSimulation(HttpCase):
             "channel_id": "test_channel"
         }
         
-        # Mock the core service
-        with patch('odoo.addons.whatsapp_integration.services.whatsapp_core_service.WhatsAppCoreService') as MockCoreService:
-            mock_core = Mock()
-            mock_core.process_webhook.return_value = {
-                'success': True,
-                'processed_messages': 1,
-                'processed_statuses': 0
-            }
-            MockCoreService.return_value = mock_core
-            
-            # Make webhook request
-            response = self.url_open(
-                '/whatsapp/webhook/messages',
-                data=json.dumps(webhook_payload),
-                headers={'Content-Type': 'application/json'}
-            )
-            
-            self.assertEqual(response.status_code, 200)
-            
-            # Verify core service was called
-            # mock_core.process_webhook.assert_called_once()
+        # The webhook only stores the payload, processing happens in the queue cron
+        self._post_webhook('messages', webhook_payload)
+        entry = self.env['whatsapp.webhook.queue'].search([('kind', '=', 'messages')], order='id desc', limit=1)
+        self.assertEqual(entry.state, 'pending')
+        self.assertEqual(json.loads(entry.payload), webhook_payload)
+        
+        self._process_queue()
+        self.assertEqual(entry.state, 'done')
     
     def test_whapi_status_webhook(self):
         """Test WHAPI status webhook processing"""
@@ -90,13 +91,12 @@ class TestWebhookSimulation(HttpCase):
             ]
         }
         
-        response = self.url_open(
-            '/whatsapp/webhook/status',
-            data=json.dumps(webhook_payload),
-            headers={'Content-Type': 'application/json'}
-        )
+        self._post_webhook('statuses', webhook_payload)
+        entry = self.env['whatsapp.webhook.queue'].search([('kind', '=', 'statuses')], order='id desc', limit=1)
+        self.assertEqual(entry.state, 'pending')
         
-        self.assertEqual(response.status_code, 200)
+        self._process_queue()
+        self.assertEqual(entry.state, 'done')
     
     def test_twilio_webhook_simulation(self):
         """Test Twilio webhook format handling"""
@@ -149,18 +149,14 @@ class TestWebhookSimulation(HttpCase):
         
         for payload in malformed_payloads:
             with self.subTest(payload=payload):
-                response = self.url_open(
-                    '/whatsapp/webhook/messages',
-                    data=json.dumps(payload),
-                    headers={'Content-Type': 'application/json'}
-                )
-                
-                # Should not crash, should return error status
-                self.assertEqual(response.status_code, 200)
+                # Should be accepted without crashing
+                self._post_webhook('messages', payload)
+                entry = self.env['whatsapp.webhook.queue'].search(
+                    [('kind', '=', 'messages')], order='id desc', limit=1)
                 
-                response_data = response.json()
-                # Should handle gracefully
-                self.assertIn('status', response_data)
+                # Should be processed gracefully
+                self._process_queue()
+                self.assertEqual(entry.state, 'done')
     
     def test_duplicate_message_handling(self):
         """Test handling of duplicate webhook messages"""
@@ -170,7 +166,7 @@ class TestWebhookSimulation(HttpCase):
                     "id": "duplicate_test_123",
                     "type": "text",
                     "from": "1234567890",
-                    "chat_id": f"1234567890{WHATSAPP_USER_SUFFIX}",
+                    "chat_id": f"1234567890-group{WHATSAPP_GROUP_SUFFIX}",
                     "timestamp": 1634567890,
                     "text": {"body": "Duplicate test message"},
                     "from_me": False
@@ -180,13 +176,8 @@ class TestWebhookSimulation(HttpCase):
         
         # Send same webhook twice
         for i in range(2):
-            response = self.url_open(
-                '/whatsapp/webhook/messages',
-                data=json.dumps(webhook_payload),
-                headers={'Content-Type': 'application/json'}
-            )
-            
-            self.assertEqual(response.status_code, 200)
+            self._post_webhook('messages', webhook_payload)
+        self._process_queue()
         
         # Verify only one message was created in database
         messages = self.env['whatsapp.message'].search([
@@ -214,13 +205,8 @@ class TestWebhookSimulation(HttpCase):
             ]
         }
         
-        response = self.url_open(
-            '/whatsapp/webhook/messages',
-            data=json.dumps(group_webhook_payload),
-            headers={'Content-Type': 'application/json'}
-        )
-        
-        self.assertEqual(response.status_code, 200)
+        self._post_webhook('messages', group_webhook_payload)
+        self._process_queue()
         
         # Verify group was created/updated
         groups = self.env['whatsapp.group'].search([
@@ -239,7 +225,7 @@ class TestWebhookSimulation(HttpCase):
                     "id": "media_test_123",
                     "type": "image",
                     "from": "1234567890",
-                    "chat_id": f"1234567890{WHATSAPP_USER_SUFFIX}",
+                    "chat_id": f"1234567890-group{WHATSAPP_GROUP_SUFFIX}",
                     "timestamp": 1634567890,
                     "image": {
                         "caption": "Test image caption",
@@ -251,13 +237,8 @@ class TestWebhookSimulation(HttpCase):
             ]
         }
         
-        response = self.url_open(
-            '/whatsapp/webhook/messages',
-            data=json.dumps(media_webhook_payload),
-            headers={'Content-Type': 'application/json'}
-        )
-        
-        self.assertEqual(response.status_code, 200)
+        self._post_webhook('messages', media_webhook_payload)
+        self._process_queue()
         
         # Verify media message was saved
         messages = self.env['whatsapp.message'].search([
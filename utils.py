@@ -2,15 +2,110 @@
 WhatsApp Integration Utilities
 Common utility functions used across the module
 """
+import os
 import re
+import json
+import time
 import base64
+import binascii
 import mimetypes
-from typing import Optional, Tuple
+import threading
+from collections import OrderedDict
+from datetime import datetime
+from typing import Any, Callable, Hashable, Optional, Tuple, Union
 from .constants import (
-    IMAGE_HEADERS, MIME_TYPES, WHATSAPP_GROUP_SUFFIX, 
-    WHATSAPP_USER_SUFFIX, ERROR_MESSAGES
+    IMAGE_HEADERS, IMAGE_HEADER_BYTES, IMAGE_SIGNATURES, FLAT_MIME_TYPES, DEFAULT_MIME_TYPES, WHATSAPP_GROUP_SUFFIX, 
+    WHATSAPP_USER_SUFFIX, WHATSAPP_GROUP_SUFFIX_LEN, WHATSAPP_USER_SUFFIX_LEN, ERROR_MESSAGES
 )
 
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+
+# Deletion table for the whitespace base64 payloads pick up (line breaks, spaces)
+_BASE64_WHITESPACE = str.maketrans('', '', '\r\n ')
+
+
+def strip_base64_whitespace(data: str) -> str:
+    """
+    Remove line breaks and spaces from base64 text in a single pass
+    
+    Args:
+        data: Base64 text, possibly wrapped in lines
+        
+    Returns:
+        Base64 text without whitespace
+    """
+    return data.translate(_BASE64_WHITESPACE)
+
+
+_PRINTABLE_ASCII = bytes(range(0x20, 0x7f))
+
+
+def decodes_to_binary(clean_data: str) -> bool:
+    """
+    Tell from its first bytes whether base64 text decodes to binary content
+    
+    Double-encoded payloads decode to base64 text (or a data URL), so binary
+    content such as a PNG or JPEG signature rules them out without decoding
+    the whole payload.
+    
+    Args:
+        clean_data: Base64 text without whitespace
+        
+    Returns:
+        True if the decoded head contains non-printable bytes
+    """
+    try:
+        head = base64.b64decode(clean_data[:16])
+    except (binascii.Error, ValueError):
+        return False
+    return bool(head.translate(None, _PRINTABLE_ASCII))
+
+
+def detect_image_mime_type(data: Union[str, bytes]) -> Optional[str]:
+    """
+    Detect the image format of base64 data from its first 12 bytes
+    
+    Only the first base64 characters are decoded, so the cost does not grow
+    with the size of the media.
+    
+    Args:
+        data: Base64 text or base64-encoded bytes (e.g. a Binary field value)
+        
+    Returns:
+        Image MIME type, or None when the data is not a known image format
+    """
+    if isinstance(data, bytes):
+        data = data[:32].decode('ascii', 'ignore')
+    try:
+        head = base64.b64decode(strip_base64_whitespace(data[:32])[:16])
+    except (binascii.Error, ValueError):
+        return None
+    for signature, mime_type in IMAGE_SIGNATURES:
+        if head.startswith(signature):
+            if mime_type == 'image/webp' and head[8:12] != b'WEBP':
+                return None
+            return mime_type
+    return None
+
+
+def has_image_header(data: Union[str, bytes]) -> bool:
+    """
+    Check whether base64 text starts with a known image header
+    
+    Args:
+        data: Base64 text (or data URL) to inspect, as str or as undecoded bytes
+        
+    Returns:
+        True if data starts with one of IMAGE_HEADERS
+    """
+    if isinstance(data, bytes):
+        return data.startswith(IMAGE_HEADER_BYTES)
+    return bool(data) and data.startswith(IMAGE_HEADERS)
+
 
 def validate_phone_number(phone: str) -> Tuple[bool, str]:
     """
@@ -52,6 +147,20 @@ def is_user_id(identifier: str) -> bool:
     return identifier.endswith(WHATSAPP_USER_SUFFIX)
 
 
+def strip_group_suffix(identifier: str) -> str:
+    """Remove the WhatsApp group suffix from an identifier, if present"""
+    if identifier.endswith(WHATSAPP_GROUP_SUFFIX):
+        return identifier[:-WHATSAPP_GROUP_SUFFIX_LEN]
+    return identifier
+
+
+def strip_user_suffix(identifier: str) -> str:
+    """Remove the WhatsApp user suffix from an identifier, if present"""
+    if identifier.endswith(WHATSAPP_USER_SUFFIX):
+        return identifier[:-WHATSAPP_USER_SUFFIX_LEN]
+    return identifier
+
+
 def format_whatsapp_id(phone: str, is_group: bool = False) -> str:
     """
     Format phone number as WhatsApp ID
@@ -71,6 +180,11 @@ def format_whatsapp_id(phone: str, is_group: bool = False) -> str:
         return f"{clean_phone}{WHATSAPP_USER_SUFFIX}"
 
 
+def normalize_phone_digits(identifier: str) -> str:
+    """Reduce a phone number or WhatsApp user ID to its digits, so both forms compare equal"""
+    return re.sub(r'\D', '', strip_user_suffix(identifier or ''))
+
+
 def fix_double_base64_encoding(data: str) -> str:
     """
     Fix double base64 encoding issue from Odoo binary fields
@@ -83,7 +197,11 @@ def fix_double_base64_encoding(data: str) -> str:
     """
     try:
         # Clean the base64 data first
-        clean_data = data.replace('\n', '').replace('\r', '').replace(' ', '')
+        clean_data = strip_base64_whitespace(data)
+        
+        # Binary content (the common case) is not double encoded, skip the full decode
+        if decodes_to_binary(clean_data):
+            return clean_data
         
         # Try to decode and check if it's double encoded
         try:
@@ -91,16 +209,9 @@ def fix_double_base64_encoding(data: str) -> str:
             
             # Check if the first decode result is still base64 by trying to decode it as text
             try:
-                potential_base64 = first_decode.decode('utf-8')
-                
-                # Check if this looks like base64 by checking for image headers
-                header_match = False
-                for header in IMAGE_HEADERS:
-                    if potential_base64.startswith(header):
-                        header_match = True
-                        break
-                
-                if header_match:
+                # Check for image headers on the raw bytes; only a match is decoded as text
+                if has_image_header(first_decode):
+                    potential_base64 = first_decode.decode('ascii')
                     # Validate this is actually valid base64 by decoding it
                     try:
                         base64.b64decode(potential_base64, validate=True)
@@ -108,13 +219,15 @@ def fix_double_base64_encoding(data: str) -> str:
                     except Exception:
                         pass
                         
-                # Additional check: if the decoded string is mostly base64 characters
-                elif _looks_like_base64(potential_base64):
-                    try:
-                        base64.b64decode(potential_base64, validate=True)
-                        return potential_base64
-                    except Exception:
-                        pass
+                else:
+                    potential_base64 = first_decode.decode('utf-8')
+                    # Additional check: if the decoded string is mostly base64 characters
+                    if _looks_like_base64(potential_base64):
+                        try:
+                            base64.b64decode(potential_base64, validate=True)
+                            return potential_base64
+                        except Exception:
+                            pass
                         
             except UnicodeDecodeError:
                 # First decode is binary (correct), not double encoded
@@ -153,6 +266,26 @@ def _looks_like_base64(text: str) -> bool:
             len(text) > 20)  # Reasonable minimum size for image data
 
 
+def resolve_mime_type(media_type: str, filename: str = None) -> str:
+    """
+    Resolve MIME type from media type and filename extension
+    
+    Args:
+        media_type: Media type category (image, video, audio, document)
+        filename: File name with extension
+        
+    Returns:
+        MIME type string, falling back to the media type default
+    """
+    if filename:
+        ext = os.path.splitext(filename)[1].lower()
+        mime_type = FLAT_MIME_TYPES.get((media_type, ext))
+        if mime_type:
+            return mime_type
+    
+    return DEFAULT_MIME_TYPES.get(media_type, 'application/octet-stream')
+
+
 def get_mime_type_from_filename(filename: str, media_type: str = None) -> str:
     """
     Get MIME type from filename and media type
@@ -173,16 +306,8 @@ def get_mime_type_from_filename(filename: str, media_type: str = None) -> str:
         return mime_type
     
     # Fallback to our mapping
-    if media_type and media_type in MIME_TYPES:
-        type_map = MIME_TYPES[media_type]
-        
-        # Find by extension
-        for ext, mime in type_map.items():
-            if ext != 'default' and filename.lower().endswith(ext):
-                return mime
-        
-        # Return default for this media type
-        return type_map['default']
+    if media_type:
+        return resolve_mime_type(media_type, filename)
     
     return 'application/octet-stream'
 
@@ -199,7 +324,7 @@ def validate_base64(data: str) -> bool:
     """
     try:
         # Clean the data
-        clean_data = data.replace('\n', '').replace('\r', '').replace(' ', '')
+        clean_data = strip_base64_whitespace(data)
         
         # Try to decode
         decoded = base64.b64decode(clean_data, validate=True)
@@ -212,6 +337,48 @@ def validate_base64(data: str) -> bool:
         return False
 
 
+def json_dumps(value: Any, default: Optional[Callable[[Any], Any]] = None) -> str:
+    """
+    Serialize a value to compact JSON text
+    
+    Uses orjson when it is installed and falls back to the standard library.
+    
+    Args:
+        value: Value to serialize
+        default: Called for objects that are not serializable otherwise
+    """
+    if orjson is not None:
+        return orjson.dumps(value, default=default, option=orjson.OPT_NON_STR_KEYS).decode()
+    return json.dumps(value, separators=(',', ':'), default=default)
+
+
+def json_loads(data: str) -> Any:
+    """Parse JSON text, using orjson when it is installed"""
+    if orjson is not None:
+        return orjson.loads(data)
+    return json.loads(data)
+
+
+# (epoch second, formatted timestamp) of the last now_isoformat() call, swapped as one tuple
+_LAST_ISO_TIMESTAMP = (0, '')
+
+
+def now_isoformat() -> str:
+    """
+    Current UTC time formatted like fields.Datetime.now().isoformat()
+    
+    The string is formatted once per second and reused by every call in that
+    second, which keeps it off the hot path of response building.
+    """
+    global _LAST_ISO_TIMESTAMP
+    second = int(time.time())
+    cached_second, timestamp = _LAST_ISO_TIMESTAMP
+    if second != cached_second:
+        timestamp = datetime.utcfromtimestamp(second).isoformat()
+        _LAST_ISO_TIMESTAMP = (second, timestamp)
+    return timestamp
+
+
 def truncate_string(text: str, max_length: int = 100, suffix: str = "...") -> str:
     """
     Truncate string to maximum length
@@ -309,3 +476,118 @@ def extract_error_message(error_data) -> str:
 def get_standard_error_message(error_key: str, default: str = None) -> str:
     """Get standardized error message from constants"""
     return ERROR_MESSAGES.get(error_key, default or ERROR_MESSAGES.get('API_ERROR', 'Unknown error'))
+
+
+class TTLCache:
+    """
+    Small thread-safe LRU cache whose entries expire after a fixed TTL
+
+    Values are kept per worker process, so callers should only store plain
+    data (ids, dicts, strings) and never recordsets bound to a cursor.
+    """
+
+    def __init__(self, maxsize: int = 1024, ttl: float = 300):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        """Return the cached value for key, or default if missing or expired"""
+        with self._lock:
+            item = self._data.get(key)
+            if item is None:
+                return default
+            expires_at, value = item
+            if expires_at < time.monotonic():
+                del self._data[key]
+                return default
+            self._data.move_to_end(key)
+            return value
+
+    def set(self, key: Hashable, value: Any) -> None:
+        """Store value under key, evicting the least recently used entry if full"""
+        with self._lock:
+            self._data[key] = (time.monotonic() + self.ttl, value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def pop(self, key: Hashable, default: Any = None) -> Any:
+        """Remove key and return its value"""
+        with self._lock:
+            item = self._data.pop(key, None)
+            return item[1] if item else default
+
+    def discard_where(self, predicate: Callable[[Hashable], bool]) -> int:
+        """Remove every key matching predicate and return how many were removed"""
+        with self._lock:
+            keys = [key for key in self._data if predicate(key)]
+            for key in keys:
+                del self._data[key]
+            return len(keys)
+
+    def clear(self) -> None:
+        """Remove all entries"""
+        with self._lock:
+            self._data.clear()
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+
+class CircuitBreaker:
+    """
+    Thread-safe circuit breaker for an upstream API
+
+    Opens after fail_max consecutive failures and rejects calls for
+    reset_timeout seconds, then lets a single trial call through.
+    """
+
+    def __init__(self, fail_max: int = 5, reset_timeout: float = 60):
+        self.fail_max = fail_max
+        self.reset_timeout = reset_timeout
+        self._failures = 0
+        self._opened_at = None
+        self._trial_in_flight = False
+        self._lock = threading.Lock()
+
+    def allow(self) -> bool:
+        """
+        Return whether a call may be attempted now
+
+        A caller allowed the half-open trial must report its outcome with
+        record_success or record_failure, other callers are rejected until then.
+        """
+        with self._lock:
+            if self._trial_in_flight:
+                return False
+            if self._opened_at is None:
+                return True
+            if time.monotonic() - self._opened_at >= self.reset_timeout:
+                # Half-open: allow one trial, re-open immediately if it fails
+                self._opened_at = None
+                self._failures = self.fail_max - 1
+                self._trial_in_flight = True
+                return True
+            return False
+
+    def record_success(self) -> None:
+        """Close the breaker after a successful call"""
+        with self._lock:
+            self._failures = 0
+            self._opened_at = None
+            self._trial_in_flight = False
+
+    def record_failure(self) -> None:
+        """Count a failed call, opening the breaker once fail_max is reached"""
+        with self._lock:
+            self._trial_in_flight = False
+            self._failures += 1
+            if self._failures >= self.fail_max:
+                self._opened_at = time.monotonic()
+
+    @property
+    def is_open(self) -> bool:
+        with self._lock:
+            return self._opened_at is not None
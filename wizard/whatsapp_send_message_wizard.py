@@ -2,6 +2,7 @@ from odoo import models, fields, api
 import logging
 import base64
 from ..constants import MESSAGE_TYPES, PROVIDERS, PROVIDER_WHAPI, PROVIDER_WASSENGER, STATUS_SENT
+from ..utils import detect_image_mime_type
 
 _logger = logging.getLogger(__name__)
 
@@ -106,6 +107,12 @@ class WhatsAppSendMessageWizard(models.TransientModel):
         success_count = 0
         error_count = 0
         
+        # Decode and normalize the media once for every group instead of once per group
+        media_base64 = None
+        media_memo = {}
+        if self.message_type == 'media' and self.media_file and config and config.provider == PROVIDER_WHAPI:
+            media_base64 = self._get_media_base64(api_service, media_memo)
+        
         for group in self.group_ids:
             try:
                 # Get group identifier
@@ -116,7 +123,8 @@ class WhatsAppSendMessageWizard(models.TransientModel):
                     continue
                 
                 # Send message using single message logic
-                result = self._send_message_to_recipient(api_service, config, recipient_phone, group)
+                result = self._send_message_to_recipient(api_service, config, recipient_phone, group,
+                                                         media_base64, media_memo)
                 
                 if result.get('success') or result.get('sent'):
                     success_count += 1
@@ -168,8 +176,24 @@ class WhatsAppSendMessageWizard(models.TransientModel):
                 }
             }
 
-    def _send_message_to_recipient(self, api_service, config, recipient_phone, target_group=None):
-        """Core logic to send message to a specific recipient"""
+    def _get_media_base64(self, api_service, media_memo=None):
+        """Media file as clean base64 text, with any double encoding from the binary field removed"""
+        media_base64 = self.media_file
+        if isinstance(media_base64, bytes):
+            try:
+                media_base64 = media_base64.decode('utf-8')
+            except UnicodeDecodeError:
+                # True binary data - encode to base64
+                media_base64 = base64.b64encode(media_base64).decode('utf-8')
+        return api_service._fix_double_encoding(media_base64, media_memo)
+
+    def _send_message_to_recipient(self, api_service, config, recipient_phone, target_group=None, media_base64=None,
+                                   media_memo=None):
+        """Core logic to send message to a specific recipient
+
+        media_base64 is the media already prepared by _get_media_base64, and media_memo the
+        memo it was prepared with, when the caller sends the same file to several recipients.
+        """
         # Determine media type if sending media
         detected_media_type = 'text'  # Default
         if self.message_type == 'media':
@@ -186,6 +210,9 @@ class WhatsAppSendMessageWizard(models.TransientModel):
                     detected_media_type = 'document'
                 
                 _logger.info(f"Detected media type: {detected_media_type} from filename: {self.media_file_name}")
+            elif self.media_file and detect_image_mime_type(self.media_file):
+                # No filename, but the first bytes of the file are an image signature
+                detected_media_type = 'image'
             else:
                 # No filename, default to document
                 detected_media_type = 'document'
@@ -202,7 +229,7 @@ class WhatsAppSendMessageWizard(models.TransientModel):
                 
                 # Convert binary data to base64 string for the NEW data URL approach
                 # Odoo Binary fields are already base64-encoded strings
-                media_base64 = self.media_file
+                media_base64 = media_base64 or self.media_file
                 
                 if not media_base64:
                     raise Exception('Invalid media file data')
@@ -213,7 +240,8 @@ class WhatsAppSendMessageWizard(models.TransientModel):
                     media_base64,  # Base64 string, not bytes
                     self.media_file_name,
                     detected_media_type,  # Use local variable
-                    self.media_caption or self.message
+                    self.media_caption or self.message,
+                    media_memo=media_memo
                 )
         else:
             # Wassenger service (legacy) - keeping for backwards compatibility